@@ -1,53 +1,14 @@
 #%%
-import jax
 import jax.numpy as jnp
 import jax.random as jr
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from tqdm import trange
-
-def rbf_kernel(x, y, sigma=1.0):
-    diff = x - y
-    return jnp.exp(-jnp.sum(diff**2) / (2 * sigma**2))
-
-def grad_rbf_kernel_wrt_x(x, y, sigma=1.0):
-    # gradient wrt x (the particle) of φ(y−x)
-    diff = y - x
-    return diff / (sigma**2) * rbf_kernel(x, y, sigma)
-
-def empirical_bayes_samples(key, n):
-    key_theta, key_eps = jr.split(key)
-    # Sample standard 2D normal, then normalize each row to unit length
-    theta_raw = jr.normal(key_theta, (n, 2))
-    theta = theta_raw / jnp.linalg.norm(theta_raw, axis=1, keepdims=True) * R
-    eps = jr.normal(key_eps, (n, 2))
-    Y = theta + eps
-    return Y
-
-@jax.jit
-def _step(Y, X, sigma, dt):
-    # diff = x_i - Y_k  →  shape (n,m,2)
-    diff = X[None, :, :] - Y[:, None, :]
-    sq   = jnp.sum(diff**2, axis=-1)
-
-    phi      = jnp.exp(-sq / (2*sigma**2))           # (n,m)
-    denom    = phi.mean(axis=1, keepdims=True)       # (n,1)
-    grad_phi = diff * (phi[..., None] / sigma**2)    # (n,m,2)
-
-    drift = (grad_phi / denom[..., None]).mean(0)    # (m,2)
-    dt = dt * 1/jnp.linalg.norm(drift)**0.5
-    return X - dt * drift                            # Euler step
-
-def wasserstein_gf_trajectory(Y, X_init, *, n_steps=100, dt=0.1, sigma=1.0):
-    X = X_init
-    traj = [X]
-    for _ in trange(n_steps):
-        X = _step(Y, X, sigma, dt)
-        traj.append(X)
-    return jnp.stack(traj)        # (n_steps+1, m, 2)
+
+from mathscripts.empirical_bayes import (R, chunk_size_for, empirical_bayes_samples, run_checkpointed,
+                                         save_animation, wasserstein_gf_minibatch, wasserstein_gf_neighbors,
+                                         wasserstein_gf_scan)
 
 # Generate data and run the gradient flow
-R = 3
 key = jr.PRNGKey(42)
 n = 200_000
 m = 400
@@ -59,7 +20,43 @@ key_subset = jr.PRNGKey(123)
 subset_idx = jr.choice(key_subset, n, shape=(m,), replace=False)
 X_init = Y[subset_idx]
 
-trajectory = wasserstein_gf_trajectory(Y, X_init, n_steps=n_steps, dt=1., sigma=1.0)
+# the dense (n,m,2) kernel would take ~1 GB per step here, so scan over blocks of Y.
+# frames and checkpoints go to run_dir; rerunning after a crash resumes from the last checkpoint
+run_dir = "empirical_bayes_run"
+trajectory = run_checkpointed(run_dir, Y, X_init, n_steps=n_steps, dt=1., sigma=1.0, chunk_size=chunk_size_for(m),
+                              checkpoint_every=10)
+
+#%%
+# Minibatch vs full batch: distance of the particles to the circle along the flow, and wall time
+import time
+
+def circle_error(traj):
+    return jnp.abs(jnp.linalg.norm(traj, axis=-1) - R).mean(axis=-1)   # (n_frames,)
+
+err_full = circle_error(trajectory)
+print(f"full batch (n={n}): final circle error {err_full[-1]:.4f}")
+for batch_size, decay in [(1_000, 0.0), (1_000, 0.5), (10_000, 0.0), (10_000, 0.5)]:
+    key_mb = jr.PRNGKey(7)
+    wasserstein_gf_minibatch(key_mb, Y, X_init, n_steps=n_steps, batch_size=batch_size, dt=1., decay=decay)[1].block_until_ready()
+    t1 = time.time()
+    _, traj_mb = wasserstein_gf_minibatch(key_mb, Y, X_init, n_steps=n_steps, batch_size=batch_size, dt=1., decay=decay)
+    traj_mb.block_until_ready()
+    t2 = time.time()
+    err_mb = circle_error(traj_mb)
+    print(f"batch {batch_size:>6}, decay {decay}: final circle error {err_mb[-1]:.4f}, "
+          f"max gap to full batch {jnp.abs(err_mb - err_full).max():.4f}, {t2-t1:.2f} s")
+
+#%%
+# Neighbor-list truncation vs the exact step. With sigma = 1 nearly every pair is within range on this
+# data, so use a narrower kernel where most of phi is numerically zero
+sigma_nl, steps_nl = 0.3, 10
+t1 = time.time()
+_, traj_exact = wasserstein_gf_scan(Y, X_init, n_steps=steps_nl, dt=0.3, sigma=sigma_nl, chunk_size=chunk_size_for(m))
+traj_exact.block_until_ready()
+t2 = time.time()
+traj_nl, info = wasserstein_gf_neighbors(Y, X_init, n_steps=steps_nl, dt=0.3, sigma=sigma_nl, cutoff=5.0)
+t3 = time.time()
+print(f"exact {t2-t1:.1f} s, neighbor list {t3-t2:.1f} s, max deviation {jnp.abs(traj_nl - traj_exact).max():.2e}, {info}")
 
 #%%
 # # Plot heatmap of Y in a separate figure
@@ -100,17 +97,18 @@ def init():
     return particles,
 
 def animate(frame):
-    X = trajectory[frame]
+    X = trajectory[frame]    # memory-mapped, read from disk one frame at a time
     particles.set_data(X[:,0], X[:,1])
     ax.set_title(f"Wasserstein Gradient Flow Step {frame}")
     return particles,
 
 ani = animation.FuncAnimation(
-    fig, animate, frames=n_steps+1, interval=100, blit=True, init_func=init
+    fig, animate, frames=len(trajectory), interval=100, blit=True, init_func=init
 )
 
-# Save the animation to a file
-ani.save("empirical_bayes.gif", writer="pillow", fps=30)
+# Save the animation to a file. The 200k data points are drawn once into the background
+# and every frame only adds the particles
+save_animation("empirical_bayes.gif", trajectory, Y)
 
 plt.show()
 
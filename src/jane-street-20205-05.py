@@ -1,32 +1,64 @@
 #%%
-def digits_in_range(n, low=2, high=6):
-    return all(low <= int(d) <= high for d in str(n))
+from math import isqrt
+
+import numpy as np
+
+def squares_with_digits(max_digits, digit_ok, pair_ok=None, min_digits=1, chunk=1 << 18):
+    """Yield the perfect squares with min_digits..max_digits digits (at most 34) whose digits all
+    satisfy digit_ok(d), and whose neighbouring digits satisfy pair_ok(higher, lower) if given.
+
+    Roots are built digit by digit from the least significant end. The last k digits of i*i depend
+    only on i mod 10^k, so a residue whose square already has a forbidden digit in its k-digit
+    suffix is dropped with all its extensions. A level is expanded for many residues at once
+    with numpy. For each residue r it keeps the high part floor(r*r / 10^k) and the top suffix
+    digit, since floor((r + d*10^k)^2 / 10^k) = high + 2*r*d + d*d*10^k. Every new root with k+1
+    digits has a complete square: its suffix is known, and its high part is checked digit by digit.
+    Squares come out in no particular order.
+    """
+    if max_digits > 34:
+        raise ValueError("the int64 arithmetic covers squares of up to 34 digits")
+    allowed = np.array([bool(digit_ok(d)) for d in range(10)])
+    pairs = np.array([[pair_ok is None or bool(pair_ok(a, b)) for b in range(10)] for a in range(10)])
+    i_min, i_max = isqrt(10**(min_digits - 1) - 1) + 1, isqrt(10**max_digits - 1)
 
-def no_consecutive_gt2(n):
-    s = str(n)
-    for i in range(len(s) - 1):
-        if int(s[i]) > 2 and int(s[i+1]) > 2:
-            return False
-    return True
+    def expand(k, r, high, top):
+        step = 10**k
+        nxt = []
+        for d in range(10):
+            i = r + d * step
+            h = high + 2 * d * r + d * d * step         # floor(i*i / 10^k)
+            digit, h = h % 10, h // 10
+            ok = (i <= i_max) & allowed[digit]
+            if k:
+                ok &= pairs[digit, top]
+            if d and step <= i_max:
+                # i has k+1 digits: check the digits of i*i above the suffix
+                done = ok & (i >= i_min)
+                x, prev = h[done], digit[done]
+                full = np.ones(len(x), bool)
+                while np.any(x > 0):
+                    more = x > 0
+                    low = x % 10
+                    full &= ~more | (allowed[low] & pairs[low, prev])
+                    prev = np.where(more, low, prev)
+                    x //= 10
+                for root in i[done][full].tolist():
+                    yield root * root
+            # roots extending i are at least 10^(k+1), so their squares have all k+1 digits of this suffix
+            if 10 * step <= i_max:
+                nxt.append((i[ok], h[ok], digit[ok]))
+        if nxt:
+            r, high, top = (np.concatenate(a) for a in zip(*nxt))
+            for start in range(0, len(r), chunk):
+                part = slice(start, start + chunk)
+                yield from expand(k + 1, r[part], high[part], top[part])
+
+    zero = np.zeros(1, np.int64)
+    yield from expand(0, zero, zero, zero)
 
-results = []
 max_digits = 11
-min_square = int('2' * 1)
-max_square = int('6' * max_digits)
-
-# Find the range of numbers whose squares could have up to 11 digits
-start = int(min_square ** 0.5)
-end = int(max_square ** 0.5) + 1
-
-for i in range(start, end):
-    sq = i * i
-    if sq > max_square:
-        break
-    sq = str(sq)
-    if digits_in_range(sq) and len(sq) <= max_digits and no_consecutive_gt2(sq):
-        results.append(sq)
-    # if digits_in_range(sq[:-1]) and len(str(sq)) <= max_digits and digits_in_range(sq[-1:], high=6):
-    #     results.append(sq)
+results = sorted(squares_with_digits(max_digits, lambda d: 2 <= d <= 6, lambda a, b: not (a > 2 and b > 2)))
+results = [str(sq) for sq in results]
 
 # Sort by number of digits in the square, ascending
 # results.sort(key=lambda x: len(str(x)))
@@ -36,8 +68,8 @@ for sq in results:
     print(sq)
 
 #%%
+import time
 from itertools import combinations, product
-from math import isqrt
 
 # ── puzzle-specific constants (edit if I mis-guessed) ────────────────
 N            = 11                       # cells in top row
@@ -48,12 +80,7 @@ BASE_DIGITS  = (1, 2)                   # only 1 / 2 may be written initially
 # ── helper tables ───────────────────────────────────────────────────
 def squares_with_small_digits(m=11, lo=1, hi=6):
     """All perfect squares (≥2 digits, ≤m digits) whose digits are in [lo, hi]."""
-    out, bound = set(), 10**m - 1
-    for k in range(4, isqrt(bound) + 1):     # 4 = smallest 2-digit square
-        s = str(k * k)
-        if all(lo <= int(d) <= hi for d in s):
-            out.add(int(s))
-    return out
+    return set(squares_with_digits(m, lambda d: lo <= d <= hi, min_digits=2))
 
 GOOD_SQUARES = squares_with_small_digits()
 
@@ -98,23 +125,194 @@ def segments(row, tiles):
     return nums
 
 # ── brute-force search ──────────────────────────────────────────────
-solutions = []
-for base in product(BASE_DIGITS, repeat=N):
-    if not regions_ok(base):
-        continue
-    for r in range(N + 1):
-        for tiles in combinations(range(N), r):
-            if not legal_tiles(tiles):
-                continue
-            row = apply_tiles(base, tiles)
-            if any(idx in YELLOW and row[idx] != base[idx] for idx in YELLOW):
+def brute_force_layouts():
+    solutions = []
+    for base in product(BASE_DIGITS, repeat=N):
+        if not regions_ok(base):
+            continue
+        for r in range(N + 1):
+            for tiles in combinations(range(N), r):
+                if not legal_tiles(tiles):
+                    continue
+                row = apply_tiles(base, tiles)
+                if any(idx in YELLOW and row[idx] != base[idx] for idx in YELLOW):
+                    continue
+                nums = segments(row, tiles)
+                if nums and all(n in GOOD_SQUARES for n in nums):
+                    solutions.append((base, tiles, nums))
+    return solutions
+
+# ── pruned search ───────────────────────────────────────────────────
+END = None                              # trie key: the digits so far form a whole number
+
+def digit_trie(numbers):
+    """nested dicts keyed by digit, with node[END] set where a number ends."""
+    root = {}
+    for num in numbers:
+        node = root
+        for d in map(int, str(num)):
+            node = node.setdefault(d, {})
+        node[END] = True
+    return root
+
+def search_layouts(n=N, reg_splits=REG_SPLITS, yellow=YELLOW, base_digits=BASE_DIGITS, squares=GOOD_SQUARES,
+                   prefix=(), trie=None):
+    """Yield (base, tiles, nums) for every layout the brute force accepts, deciding cells left to right.
+
+    A cell's visible digit is known once its right neighbour is decided. It then extends the open
+    segment, (trie node, length, value, numbers so far), which is dropped as soon as it is not a
+    prefix of a square. A lone digit may be anything, since one-digit segments are not numbers.
+    Only bases starting with prefix are searched; trie, if given, is digit_trie(squares).
+    """
+    trie = digit_trie(squares) if trie is None else trie
+    base, tiled = [0] * n, [False] * n
+
+    def close(seg):
+        node, length, value, nums = seg
+        if length >= 2:
+            if node is None or END not in node:
+                return None
+            nums = nums + (value,)
+        return trie, 0, 0, nums
+
+    def settle(j, seg):
+        if tiled[j]:
+            return close(seg)
+        v = base[j]
+        if j not in yellow:
+            if j > 0 and tiled[j-1]:
+                v += base[j-1]
+            if j + 1 < n and tiled[j+1]:
+                v += base[j+1]
+            v = min(9, v)
+        node, length, value, nums = seg
+        child = node.get(v) if node is not None else None
+        if child is None and length >= 1:
+            return None
+        return child, length + 1, 10 * value + v, nums
+
+    def visit(i, seg):
+        if i == n:
+            seg = settle(n - 1, seg)
+            if seg is not None:
+                seg = close(seg)
+            if seg is not None and seg[3]:
+                yield tuple(base), tuple(j for j in range(n) if tiled[j]), list(seg[3])
+            return
+        for d in (prefix[i],) if i < len(prefix) else base_digits:
+            if i in reg_splits and i > 0 and base[i-1] == d:
                 continue
-            nums = segments(row, tiles)
-            if nums and all(n in GOOD_SQUARES for n in nums):
-                solutions.append((base, tiles, nums))
+            base[i] = d
+            for t in (False, True):
+                if t and (i in yellow or (i > 0 and tiled[i-1])):
+                    continue
+                tiled[i] = t
+                s = settle(i - 1, seg) if i > 0 else seg
+                if s is not None:
+                    yield from visit(i + 1, s)
+        tiled[i] = False
+
+    if n > 0:
+        yield from visit(0, (trie, 0, 0, ()))
+
+solutions = list(search_layouts())
+assert sorted(solutions) == sorted(brute_force_layouts())
 
 # ── outcome ─────────────────────────────────────────────────────────
 print(f"{len(solutions)} valid layouts found.")
 for b, t, nums in solutions:
     s = ''.join(str(d) if i not in t else '■' for i, d in enumerate(b))
     print(f"{s}  tiles={t}  numbers={nums}")
+
+# ── larger boards, out of reach of the brute force ──────────────────
+for n, splits, yellow in [(16, {3, 8, 12}, {5, 13}), (20, {3, 8, 12, 17}, {5, 13})]:
+    t0 = time.time()
+    count = sum(1 for _ in search_layouts(n, splits, yellow))
+    print(f"N={n}: {count} layouts in {time.time() - t0:.2f} s")
+
+#%%
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+# ── sharded search in a process pool ────────────────────────────────
+def base_prefixes(depth, reg_splits=REG_SPLITS, base_digits=BASE_DIGITS):
+    """the base digits of the first depth cells allowed by the thick borders"""
+    return [p for p in product(base_digits, repeat=depth)
+            if all(p[i-1] != p[i] for i in range(1, depth) if i in reg_splits)]
+
+_SHARD_JOB = None                       # search_layouts arguments, set before the pool forks
+
+def _search_shard(prefix):
+    n, reg_splits, yellow, base_digits, squares, trie = _SHARD_JOB
+    return prefix, list(search_layouts(n, reg_splits, yellow, base_digits, squares, prefix, trie))
+
+def parallel_layouts(n=N, reg_splits=REG_SPLITS, yellow=YELLOW, base_digits=BASE_DIGITS, squares=GOOD_SQUARES,
+                     depth=None, workers=None, checkpoint=None):
+    """Yield what search_layouts yields, searching the bases shard by shard in forked worker processes.
+
+    A shard is a prefix of the base of depth cells; by default the depth gives at least 16 shards per
+    worker, so that uneven shards still balance. The squares and their trie are built once here and
+    inherited by the workers. Layouts come out shard by shard as shards finish. If checkpoint is a
+    path, every finished shard is appended to it as a json line, and shards already there (for the
+    same board, squares and depth) are read back instead of searched again. Without an explicit depth
+    a resumed run keeps the depth of the checkpoint, whatever the number of workers.
+    """
+    global _SHARD_JOB
+    workers = workers or os.cpu_count()
+    squares = frozenset(squares)
+    board = json.dumps([n, sorted(reg_splits), sorted(yellow), list(base_digits), sorted(squares)])
+    job_of = lambda depth: hashlib.sha1(f"{board}{depth}".encode()).hexdigest()
+
+    entries = []
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:      # a line cut short by an interrupted run
+                    continue
+    if depth is None:
+        depth = next((e["depth"] for e in entries if e.get("depth") is not None and e["job"] == job_of(e["depth"])),
+                     None)
+    if depth is None:
+        depth = 0
+        while depth < n and len(base_prefixes(depth, reg_splits, base_digits)) < 16 * workers:
+            depth += 1
+    depth = min(depth, n)
+    shards = base_prefixes(depth, reg_splits, base_digits)
+    job = job_of(depth)
+    done = {tuple(e["prefix"]): e["layouts"] for e in entries if e["job"] == job}
+    for prefix in shards:
+        for base, tiles, nums in done.get(prefix, ()):
+            yield tuple(base), tuple(tiles), nums
+    todo = [prefix for prefix in shards if prefix not in done]
+    if not todo:
+        return
+
+    _SHARD_JOB = n, reg_splits, yellow, base_digits, squares, digit_trie(squares)
+    log = open(checkpoint, "a") if checkpoint is not None else None
+    try:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = [pool.submit(_search_shard, prefix) for prefix in todo]
+            for future in tqdm(as_completed(futures), total=len(shards), initial=len(shards) - len(todo),
+                               unit="shard"):
+                prefix, layouts = future.result()
+                if log is not None:
+                    log.write(json.dumps({"job": job, "depth": depth, "prefix": prefix, "layouts": layouts}) + "\n")
+                    log.flush()
+                yield from layouts
+    finally:
+        _SHARD_JOB = None
+        if log is not None:
+            log.close()
+
+n, splits, yellow = 20, {3, 8, 12, 17}, {5, 13}
+t0 = time.time()
+layouts = list(parallel_layouts(n, splits, yellow, checkpoint="tile_layouts.jsonl"))
+print(f"N={n}: {len(layouts)} layouts in {time.time() - t0:.2f} s on {os.cpu_count()} processes")
+assert sorted(layouts) == sorted(search_layouts(n, splits, yellow))
@@ -21,41 +21,14 @@ Requires: jax, matplotlib.
 Run:  python langevin_vs_fp_experiment.py
 """
 #%%
-from __future__ import annotations
 import jax
 import jax.numpy as jnp
 import matplotlib.pyplot as plt
 from jax.scipy.stats import gaussian_kde
-from tqdm import trange
-
-# ----- helper functions -----
-@jax.jit
-def sigma(t: float | jnp.ndarray) -> jnp.ndarray:  # variance, not std
-    return 1.0 - jnp.exp(-2.0 * (t + 0.1))
-
-@jax.jit
-def kl_div(p: jnp.ndarray, q: jnp.ndarray, dx: float) -> float:
-    p_safe = jnp.clip(p, 1e-12, None)
-    q_safe = jnp.clip(q, 1e-12, None)
-    return jnp.sum(p_safe * jnp.log(p_safe / q_safe)) * dx
-
-# Ground‑truth KL between N(0, sigma(t)) and N(0,1)
-@jax.jit
-def kl_gauss_sigma(s2: jnp.ndarray) -> jnp.ndarray:
-    return 0.5 * (s2 - 1.0 - jnp.log(s2))
-
-# ----- Langevin simulation (Euler–Maruyama) -----
-@jax.jit
-def langevin_step(x: jnp.ndarray, key: jax.random.KeyArray) -> tuple[jnp.ndarray, jax.random.KeyArray]:
-    key, sub = jax.random.split(key)
-    noise = jax.random.normal(sub, x.shape)
-    x_next = x + (-x) * DT + jnp.sqrt(2.0 * DT) * noise
-    return x_next, key
-
-# ----- FP ODE simulation (explicit Euler) -----
-@jax.jit
-def fp_step(x: jnp.ndarray, t: float) -> jnp.ndarray:
-    return x + (-1.0 + 1/sigma(t)) * x * DT
+
+from mathscripts.langevin_fp import (DX, FP_METHODS, GRID, LANGEVIN_METHODS, bands, binned_kde, ensemble,
+                                     fp_kl_error, fp_solve_adaptive, kl_div, kl_gauss_sigma, langevin_kl_error,
+                                     neg_dkl_dt_ensemble, q_grid, sigma, simulate, variance)
 
 #%%
 jax.config.update("jax_enable_x64", True)
@@ -66,13 +39,8 @@ N_PARTICLES = 10_000
 DT = 0.01
 T_MAX = 2.5
 SAVE_TIMES = jnp.arange(0, T_MAX + 1e-9, 1.0)  # 0,1,2,3,4,5
-GRID = jnp.linspace(-10.0, 10.0, 1001)  # for KDE & KL
-DX = GRID[1] - GRID[0]
 BANDWIDTH = 0.2  # Silverman-ish, works well here
 
-# Target density N(0,1) on grid
-q_grid = jnp.exp(-0.5 * GRID ** 2) / jnp.sqrt(2 * jnp.pi)
-
 # ----- initial condition -----
 key, k0 = jax.random.split(key)
 init_std = jnp.sqrt(sigma(0.0))
@@ -82,48 +50,9 @@ X0 = init_std * jax.random.normal(k0, (N_PARTICLES,))
 num_steps = int(T_MAX / DT)
 save_indices = (SAVE_TIMES / DT).astype(int)
 
-langevin_samples = []
-fp_samples = []
-
-# Store all samples for KL/entropy at every step
-all_kl_langevin = []
-all_kl_fp = []
-all_kl_true = []
-all_times = []
-
-def run_simulations_and_kl():
-    x_l = X0.copy()
-    x_f = X0.copy()
-    key_sim = key
-    for step in trange(num_steps + 1):
-        t = step * DT
-        # Save for SAVE_TIMES
-        if step in save_indices:
-            langevin_samples.append(x_l)
-            fp_samples.append(x_f)
-        # Compute KL at every step
-        kde_l = gaussian_kde(x_l)
-        kde_f = gaussian_kde(x_f)
-        p_l = kde_l.pdf(GRID)
-        p_f = kde_f.pdf(GRID)
-        all_kl_langevin.append(kl_div(p_l, q_grid, DX))
-        all_kl_fp.append(kl_div(p_f, q_grid, DX))
-        all_kl_true.append(kl_gauss_sigma(sigma(t)))
-        all_times.append(t)
-        # advance one step (skip final extra step after T_MAX)
-        if step == num_steps:
-            break
-        x_l, key_sim = langevin_step(x_l, key_sim)
-        x_f = fp_step(x_f, t)
-
-run_simulations_and_kl()
-
-langevin_samples = jnp.stack(langevin_samples)  # (len(SAVE_TIMES), N)
-fp_samples = jnp.stack(fp_samples)
-all_kl_langevin = jnp.stack(all_kl_langevin)
-all_kl_fp = jnp.stack(all_kl_fp)
-all_kl_true = jnp.stack(all_kl_true)
-all_times = jnp.array(all_times)
+(langevin_samples, fp_samples), (all_kl_langevin, all_kl_fp, all_kl_true) = simulate(
+    X0, key, save_indices, num_steps, DT, sigma(0.0))  # samples: (len(SAVE_TIMES), N)
+all_times = jnp.arange(num_steps + 1) * DT
 
 #%%
 # ----- KDE & KL -----
@@ -132,11 +61,8 @@ kl_fp = []
 kl_true = []
 
 for i, t in enumerate(SAVE_TIMES):
-    # Use gaussian_kde for KDE estimation with default bandwidth
-    kde_l = gaussian_kde(langevin_samples[i])
-    kde_f = gaussian_kde(fp_samples[i])
-    p_l = kde_l.pdf(GRID)
-    p_f = kde_f.pdf(GRID)
+    p_l = binned_kde(langevin_samples[i], GRID)
+    p_f = binned_kde(fp_samples[i], GRID)
     kl_langevin.append(kl_div(p_l, q_grid, DX))
     kl_fp.append(kl_div(p_f, q_grid, DX))
     kl_true.append(kl_gauss_sigma(sigma(t)))
@@ -153,17 +79,21 @@ mid_times = (SAVE_TIMES[:-1] + SAVE_TIMES[1:]) / 2
 neg_dkl_dt_fine = lambda kl: -(kl[1:] - kl[:-1]) / DT
 fine_times = (all_times[:-1] + all_times[1:]) / 2
 
+# binned KDE against the exact gaussian_kde at the saved times
+for i, t in enumerate(SAVE_TIMES):
+    for name, samples in (("Langevin", langevin_samples[i]), ("FP", fp_samples[i])):
+        exact = gaussian_kde(samples).pdf(GRID)
+        err = jnp.max(jnp.abs(binned_kde(samples, GRID) - exact)) / jnp.max(exact)
+        print(f"t={float(t):.0f} {name:>8}: binned KDE max error {float(err):.1e} (relative to peak)")
+
 #%%
 # ----- visualization -----
 plt.figure(figsize=(12, 4))
 for i, t in enumerate(SAVE_TIMES):
     plt.subplot(2, 3, i + 1)
     xs = GRID
-    # Use gaussian_kde for plotting with default bandwidth
-    kde_l = gaussian_kde(langevin_samples[i])
-    kde_f = gaussian_kde(fp_samples[i])
-    plt.plot(xs, kde_l.pdf(xs), label="Langevin", lw=1)
-    plt.plot(xs, kde_f.pdf(xs), label="FP ODE", lw=1)
+    plt.plot(xs, binned_kde(langevin_samples[i], xs), label="Langevin", lw=1)
+    plt.plot(xs, binned_kde(fp_samples[i], xs), label="FP ODE", lw=1)
     std = jnp.sqrt(sigma(t))
     plt.plot(xs, jnp.exp(-0.5 * (xs / std) ** 2) / (std * jnp.sqrt(2 * jnp.pi)), label="True", lw=1)
     plt.title(f"t={int(t)}")
@@ -207,4 +137,47 @@ plt.legend(); plt.grid(True)
 plt.title("KL decay rate vs time (EMA smoothed, all steps)")
 plt.show()
 
+#%%
+# ----- ensemble: KL and −d/dt KL bands over seeds, for several step sizes -----
+ENSEMBLE_SEEDS = 16
+ENSEMBLE_DTS = (0.005, 0.01, 0.02)
+ens_times, ens_kl = ensemble(jax.random.PRNGKey(2), ENSEMBLE_SEEDS, ENSEMBLE_DTS, [sigma(0.0)],
+                             n_particles=N_PARTICLES, t_max=T_MAX)
+ens_mid, ens_rate = neg_dkl_dt_ensemble(ens_times, ens_kl)
+
+fig, axes = plt.subplots(1, 2, figsize=(12, 4))
+for d, dt in enumerate(ENSEMBLE_DTS):
+    for j, name in enumerate(("Langevin", "FP ODE")):
+        for ax, ts, vals in ((axes[0], ens_times[d], ens_kl), (axes[1], ens_mid[d], ens_rate)):
+            mean, lo, hi = (b[d, 0, j] for b in bands(vals))
+            line, = ax.plot(ts, mean, lw=1, label=f"{name}, dt={dt}")
+            ax.fill_between(ts, lo, hi, color=line.get_color(), alpha=0.3)
+axes[0].plot(ens_times[0], ens_kl[0, 0, 0, 2], "k--", lw=1, label="True Gaussian")
+axes[1].plot(ens_mid[0], ens_rate[0, 0, 0, 2], "k--", lw=1, label="True Gaussian")
+axes[0].set_yscale("log"); axes[0].set_ylabel("KL")
+axes[1].set_yscale("symlog", linthresh=1e-4); axes[1].set_ylabel("−d/dt KL")
+for ax in axes:
+    ax.set_xlabel("t"); ax.grid(True); ax.legend(fontsize=7)
+fig.suptitle(f"mean and 95% band over {ENSEMBLE_SEEDS} seeds")
+plt.tight_layout()
+plt.show()
+
+#%%
+# ----- integrator accuracy: max KL error on [0, T_MAX] against the exact curve -----
+var0 = sigma(0.0)
+print(f"{'method':>16} {'dt':>7} {'steps':>6} {'max KL error':>13}")
+for dt in (0.01, 0.05, 0.1, 0.25):
+    n = int(round(T_MAX / dt))
+    for method in LANGEVIN_METHODS:
+        print(f"{'Langevin ' + method:>16} {dt:7.3f} {n:6d} {float(langevin_kl_error(method, dt, n, var0)):13.2e}")
+    for method in FP_METHODS:
+        print(f"{'FP ' + method:>16} {dt:7.3f} {n:6d} {float(fp_kl_error(method, dt, n, var0)):13.2e}")
+check_times = jnp.linspace(0.0, T_MAX, 6)
+exact_kl = kl_gauss_sigma(variance(check_times, var0))
+for rtol in (1e-3, 1e-6, 1e-9):
+    c, accepted, rejected = fp_solve_adaptive(jnp.ones(1), check_times, var0, rtol, rtol * 1e-3)
+    err = jnp.max(jnp.abs(kl_gauss_sigma(var0 * c[:, 0] ** 2) - exact_kl))
+    print(f"{'FP rk45':>16} {'rtol=' + format(rtol, '.0e'):>7} {int(accepted):6d} {float(err):13.2e}"
+          f"  ({int(rejected)} rejected)")
+
 # %%
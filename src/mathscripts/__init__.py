@@ -0,0 +1,23 @@
+"""The kernels of the experiments in this repository, importable without running them.
+
+Submodules are imported on first access, so `import mathscripts` is cheap and only the modules
+that are used pay for their dependencies: the sudoku solvers need nothing beyond the standard
+library, while empirical_bayes and langevin_fp import JAX. matplotlib and POT are only imported
+inside the functions that plot or solve with them.
+
+    from mathscripts.sudoku import Sudoku          # no numpy, JAX or matplotlib
+    import mathscripts
+    mathscripts.empirical_bayes._step              # imports JAX here
+"""
+import importlib
+
+__all__ = ["benchmark", "brownian_motion", "compilation", "empirical_bayes", "frame_render", "langevin_fp", "optimal_transport",
+           "sudoku", "sudoku_batch", "sudoku_benchmark"]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
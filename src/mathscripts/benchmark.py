@@ -0,0 +1,320 @@
+"""Benchmark the hot paths of the experiments and keep the results per commit and machine.
+
+JAX functions are traced and compiled ahead of time (fn.lower(...).compile()), so tracing,
+compilation and steady-state calls are timed separately; in a plain loop over a jitted function
+the first iteration pays for all three. Every timed call ends in block_until_ready, and the peak
+memory is the compiler's buffer assignment for the call. Host code (numpy and pure Python) is
+timed directly, and its peak memory is the largest amount allocated during one call, from
+tracemalloc.
+
+The results go to a JSON file as report[machine]["runs"][commit], so runs of different commits on
+the same machine can be compared with --compare. A commit with uncommitted changes is recorded as
+<hash>+dirty. Each case imports only what it benchmarks, so e.g. --only sudoku never loads JAX.
+
+Run:  mathscripts-benchmark --only step kde sudoku -o benchmarks.json --compare <commit>
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# ----- timing -----
+def _repeat(call, min_time, max_calls=10_000):
+    """call() at least 3 times and until min_time seconds have passed; return the seconds per call"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < 3 or (time.perf_counter() - start < min_time and len(times) < max_calls):
+        t = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - t)
+    return times
+
+def _stats(times):
+    times = sorted(times)
+    return {"calls": len(times), "median_s": times[len(times) // 2], "min_s": times[0],
+            "mean_s": sum(times) / len(times)}
+
+def time_jax(fn, args=(), kwargs=None, static=None, min_time=0.5):
+    """trace and compile the jitted fn for args and kwargs (device arrays, so that no transfer is
+    timed) and the static keyword arguments static, then time calls of the compiled function"""
+    import jax
+
+    kwargs, static = kwargs or {}, static or {}
+    t0 = time.perf_counter()
+    lowered = fn.lower(*args, **kwargs, **static)
+    t1 = time.perf_counter()
+    compiled = lowered.compile()
+    t2 = time.perf_counter()
+
+    def call():
+        jax.block_until_ready(compiled(*args, **kwargs))
+
+    call()
+    result = {"trace_s": t1 - t0, "compile_s": t2 - t1, **_stats(_repeat(call, min_time))}
+    memory = compiled.memory_analysis()
+    if memory is not None:
+        result["peak_bytes"] = int(getattr(memory, "peak_memory_in_bytes", 0) or
+                                   memory.argument_size_in_bytes + memory.output_size_in_bytes
+                                   + memory.temp_size_in_bytes - memory.alias_size_in_bytes)
+    return result
+
+def time_host(call, min_time=0.5):
+    """time call() after one warm-up call, and measure its peak allocation in a separate call"""
+    call()
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {**_stats(_repeat(call, min_time)), "peak_bytes": peak}
+
+# ----- cases: generators of (params, result) -----
+CASES = {}
+
+def case(group):
+    def register(f):
+        CASES[f.__name__] = (group, f)
+        return f
+    return register
+
+@case("empirical_bayes")
+def step(min_time):
+    import jax.random as jr
+    from .empirical_bayes import _step, _step_chunked, chunk_size_for, empirical_bayes_samples
+
+    Y = empirical_bayes_samples(jr.PRNGKey(0), 200_000)
+    for n, m in [(1_000, 100), (10_000, 100), (10_000, 400), (20_000, 400)]:
+        yield {"n": n, "m": m}, time_jax(_step, (Y[:n], Y[-m:], 1.0, 1.0), min_time=min_time)
+    m = 400
+    chunk_size = chunk_size_for(m)
+    yield ({"n": len(Y), "m": m, "chunk_size": chunk_size},
+           time_jax(_step_chunked, (Y, Y[-m:], 1.0, 1.0), static={"chunk_size": chunk_size}, min_time=min_time))
+
+@case("empirical_bayes")
+def bucketing(min_time):
+    """empirical-bayes --bucket at sizes in one bucket; raises unless they share one compiled flow"""
+    import contextlib
+    import io
+    import tempfile
+    from .compilation import bucket
+    from .empirical_bayes import main, wasserstein_gf_scan
+
+    sizes = [(2_000, 100), (2_010, 101), (2_040, 110)]
+    assert len({(bucket(n), bucket(m)) for n, m in sizes}) == 1
+    before = wasserstein_gf_scan._cache_size()
+    times = []
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        for n, m in sizes:
+            t = time.perf_counter()
+            main(["--n", str(n), "--m", str(m), "--steps", "4", "--bucket", "--run-dir", os.path.join(tmp, str(m)),
+                  "-o", ""])
+            times.append(time.perf_counter() - t)
+    programs = wasserstein_gf_scan._cache_size() - before
+    if programs != 1:
+        raise RuntimeError(f"the sizes {sizes} compiled wasserstein_gf_scan {programs} times, not once")
+    yield {"n_m": sizes, "steps": 4}, {"first_s": times[0], **_stats(times[1:]), "programs": programs}
+
+@case("langevin_fp")
+def steppers(min_time):
+    import jax
+    from .langevin_fp import FP_METHODS, LANGEVIN_METHODS, fp_step, langevin_step, sigma
+
+    var0 = float(sigma(0.0))
+    for n in (10_000, 1_000_000):
+        x = jax.random.normal(jax.random.PRNGKey(0), (n,))
+        key = jax.random.PRNGKey(1)
+        for method in LANGEVIN_METHODS:
+            yield ({"fn": "langevin_step", "method": method, "N": n},
+                   time_jax(langevin_step, (x, key, 0.01), static={"method": method}, min_time=min_time))
+        for method in FP_METHODS:
+            yield ({"fn": "fp_step", "method": method, "N": n},
+                   time_jax(fp_step, (x, 0.5, 0.01, var0), static={"method": method}, min_time=min_time))
+
+@case("langevin_fp")
+def kde(min_time):
+    import jax
+    import jax.numpy as jnp
+    from .langevin_fp import GRID, binned_kde
+
+    grid = jnp.asarray(GRID)
+    for n in (10_000, 1_000_000):
+        x = jax.random.normal(jax.random.PRNGKey(0), (n,))
+        yield {"N": n, "grid": len(GRID)}, time_jax(binned_kde, (x, grid), min_time=min_time)
+
+@case("langevin_fp")
+def scan(min_time):
+    import jax
+    import jax.numpy as jnp
+    from .langevin_fp import sigma, simulate
+
+    var0 = float(sigma(0.0))
+    x0 = jnp.sqrt(var0) * jax.random.normal(jax.random.PRNGKey(0), (10_000,))
+    for num_steps in (250, 1000):
+        save_indices = jnp.arange(0, num_steps + 1, 100)
+        yield ({"N": len(x0), "num_steps": num_steps},
+               time_jax(simulate, (x0, jax.random.PRNGKey(1), save_indices), {"dt": 0.01, "var0": var0},
+                        static={"num_steps": num_steps}, min_time=min_time))
+
+@case("optimal_transport")
+def w_trials(min_time):
+    import numpy as np
+    from .optimal_transport import empirical_w, sample_trials
+
+    # one pass of the Monte Carlo loop: draw the trials and solve them all
+    for k, n, dim, num_trials in [(2, 100, 2, 100_000), (20, 100, 1, 100_000), (5, 100, 2, 1_000)]:
+        def call():
+            X, mu, mu_n = sample_trials(np.random.default_rng(0), num_trials, k, n, dim)
+            empirical_w(X, mu, mu_n, workers=1)
+        yield {"k": k, "n": n, "dim": dim, "trials": num_trials}, time_host(call, min_time)
+
+@case("optimal_transport")
+def sinkhorn(min_time):
+    import numpy as np
+    from .optimal_transport import pairwise_cost, sinkhorn_log
+
+    rng = np.random.default_rng(0)
+    for B, N in [(1, 200), (16, 200)]:
+        M = pairwise_cost(rng.normal(size=(B, N, 2)), rng.normal(size=(B, N, 2)) + 2)
+        a = np.full((B, N), 1 / N)
+        yield {"B": B, "N": N, "reg": 1.0}, time_host(lambda: sinkhorn_log(a, a, 1.0, M, tol=1e-6), min_time)
+
+@case("brownian")
+def brownian(min_time):
+    import numpy as np
+    from .brownian_motion import Box, brownian_frames
+
+    for n, mode, n_steps in [(10_000, "reflecting", 200), (10_000, "absorbing", 200), (1_000_000, "reflecting", 20)]:
+        initial = np.random.default_rng(0).normal(0, 1, (n, 2))
+
+        def call():
+            for _ in brownian_frames(initial, n_steps, 0.01, boundary=Box(-5, 5, mode), every=n_steps,
+                                     rng=np.random.default_rng(1)):
+                pass
+        result = time_host(call, min_time)
+        result["per_step_s"] = result["median_s"] / n_steps
+        yield {"particles": n, "boundary": mode, "steps": n_steps}, result
+
+@case("sudoku")
+def sudoku(min_time):
+    from .sudoku_benchmark import BACKENDS, DEFAULT_SETS, PUZZLE_SETS
+
+    for backend, solve in BACKENDS.items():
+        for name in DEFAULT_SETS:
+            puzzles = PUZZLE_SETS[name]
+            result = time_host(lambda: [solve(line) for line in puzzles], min_time)
+            result["per_puzzle_s"] = result["median_s"] / len(puzzles)
+            yield {"backend": backend, "set": name, "puzzles": len(puzzles)}, result
+
+# ----- results -----
+def git_commit():
+    """short hash of HEAD, with +dirty if tracked files have uncommitted changes"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("+dirty" if dirty else "")
+
+def machine_info():
+    return {"node": platform.node(), "machine": platform.machine(), "processor": platform.processor(),
+            "system": platform.platform(), "cpu_count": os.cpu_count()}
+
+def versions():
+    """python and the versions of numpy and JAX, if the cases imported them, and the JAX devices"""
+    info = {"python": platform.python_version()}
+    for name in ("numpy", "jax", "jaxlib"):
+        if name in sys.modules:
+            info[name] = getattr(sys.modules[name], "__version__", None)
+    if "jax" in sys.modules:
+        info["jax_devices"] = [str(d) for d in sys.modules["jax"].devices()]
+    return info
+
+def machine_key(info):
+    return f"{info['node']}-{info['machine']}-{info['cpu_count']}cpu"
+
+def _same(a, b):
+    return a["case"] == b["case"] and a["params"] == b["params"]
+
+def load(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        report = json.load(f)
+    if not isinstance(report, dict) or any(not isinstance(v, dict) or "runs" not in v for v in report.values()):
+        raise ValueError(f"{path} is not a benchmark report")
+    return report
+
+def save(path, commit, info, results):
+    """merge results into path under [machine]["runs"][commit], replacing earlier results of the same
+    cases and parameters"""
+    report = load(path)
+    entry = report.setdefault(machine_key(info), {"machine": info, "runs": {}})
+    entry["machine"] = info
+    run = entry["runs"].setdefault(commit, {"results": []})
+    run["time"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    run["versions"] = versions()
+    run["results"] = [r for r in run["results"] if not any(_same(r, new) for new in results)] + results
+    with open(path + ".tmp", "w") as f:
+        json.dump(report, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return report
+
+def _format(result, reference=None):
+    line = f"{result['median_s'] * 1e3:10.3f} ms"
+    if "compile_s" in result:
+        line += f"  trace {result['trace_s'] * 1e3:7.1f} ms  compile {result['compile_s'] * 1e3:8.1f} ms"
+    if result.get("peak_bytes") is not None:
+        line += f"  peak {result['peak_bytes'] / 2**20:8.1f} MiB"
+    if reference is not None:
+        line += f"  x{result['median_s'] / reference['median_s']:.2f} of reference"
+    return line
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the experiments.")
+    parser.add_argument("--only", nargs="+", default=None, metavar="NAME",
+                        help=f"cases or groups to run: {', '.join(CASES)}, "
+                             f"{', '.join(sorted({group for group, _ in CASES.values()}))}")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds of steady-state calls per case")
+    parser.add_argument("-o", "--output", default="benchmarks.json", help="JSON file the results are merged into")
+    parser.add_argument("--compare", default=None, metavar="COMMIT",
+                        help="print the time relative to this commit's results on the same machine")
+    args = parser.parse_args(argv)
+
+    selected = [name for name, (group, _) in CASES.items()
+                if args.only is None or name in args.only or group in args.only]
+    unknown = set(args.only or ()) - set(CASES) - {group for group, _ in CASES.values()}
+    if unknown:
+        parser.error(f"unknown cases {sorted(unknown)}")
+    try:
+        entry = load(args.output).get(machine_key(machine_info()), {"runs": {}})
+    except ValueError as e:
+        parser.error(str(e))
+    reference = []
+    if args.compare is not None:
+        if args.compare not in entry["runs"]:
+            parser.error(f"no results for {args.compare} on this machine in {args.output}")
+        reference = entry["runs"][args.compare]["results"]
+
+    results = []
+    for name in selected:
+        group, run = CASES[name]
+        for params, result in run(args.min_time):
+            record = {"case": name, "group": group, "params": params, **result}
+            match = [r for r in reference if _same(r, record)]
+            print(f"{name:>10} {json.dumps(params):<58} {_format(result, match[0] if match else None)}", flush=True)
+            results.append(record)
+
+    commit, info = git_commit(), machine_info()
+    save(args.output, commit, info, results)
+    print(f"saved {len(results)} results for {commit} on {machine_key(info)} to {args.output}")
+
+if __name__ == "__main__":
+    main()
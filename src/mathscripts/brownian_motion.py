@@ -0,0 +1,193 @@
+import numpy as np
+
+def brownian_frames(initial, n_steps, dt, *, drift=None, diffusion=1.0, boundary=None, every=1,
+                    rng=None, dtype=np.float64, block_bytes=2**26):
+    """Simulate dX = drift(X) dt + diffusion dB and yield (step, positions) for steps 0, every, 2*every, ... < n_steps.
+
+    initial is an (n_particles, 2) array. positions is the simulator's own state, updated in place
+    between yields: copy it to keep it. drift(x) returns the drift velocity of every particle and
+    boundary(x) moves particles back into the domain in place; both are optional.
+    Only the current state and one block of noise, drawn about block_bytes at a time from the
+    numpy Generator rng, are held in memory.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    x = np.array(initial, dtype=dtype)
+    block = max(1, block_bytes // x.nbytes)
+    for step in range(n_steps):
+        if step:
+            k = (step - 1) % block
+            if k == 0:
+                noise = rng.standard_normal((min(block, n_steps - step),) + x.shape, dtype=dtype)
+                noise *= np.sqrt(dt) * diffusion
+            if drift is not None:
+                x += dt * drift(x)
+            x += noise[k]
+            if boundary is not None:
+                boundary(x)
+        if step % every == 0:
+            yield step, x
+
+# ----- boundaries: callables that move particles back into the domain in place -----
+# reflecting folds positions back across the walls (as often as needed for long steps), periodic wraps
+# them around, and absorbing sets particles that left to NaN, so they stay NaN and are not drawn.
+# all work through ufuncs with out=, on the state and on scratch buffers allocated once.
+BOUNDARY_MODES = ("reflecting", "periodic", "absorbing")
+
+def _fold(x, lo, hi):
+    """reflect x into [lo, hi] in place, across both walls as often as needed: hi - |((x - lo) mod 2L) - L|, L = hi - lo"""
+    np.subtract(x, lo, out=x)
+    np.mod(x, 2 * (hi - lo), out=x)
+    np.subtract(x, hi - lo, out=x)
+    np.abs(x, out=x)
+    np.subtract(hi, x, out=x)
+
+class _Boundary:
+    def __init__(self, mode) -> None:
+        if mode not in BOUNDARY_MODES:
+            raise ValueError(f"mode must be one of {BOUNDARY_MODES}, not {mode!r}")
+        self.mode = mode
+        self._scratch = None
+
+    def scratch(self, x, columns=1):
+        """a (len(x), columns) buffer of x's dtype, reused between calls"""
+        if self._scratch is None or self._scratch.shape != (len(x), columns) or self._scratch.dtype != x.dtype:
+            self._scratch = np.empty((len(x), columns), x.dtype)
+        return self._scratch
+
+    def _absorb(self, x, inside):
+        # inside[:, 0] >= 0 for particles in the domain; add 0 * sqrt(inside), which is NaN for the others
+        with np.errstate(invalid="ignore"):
+            np.sqrt(inside, out=inside)
+        np.multiply(inside, 0, out=inside)
+        np.add(x, inside, out=x)
+
+class Box(_Boundary):
+    """the rectangle [lo[0], hi[0]] x [lo[1], hi[1]]; lo and hi may also be scalars for a square"""
+    def __init__(self, lo, hi, mode="reflecting") -> None:
+        super().__init__(mode)
+        self.lo = np.broadcast_to(np.asarray(lo, float), 2)
+        self.hi = np.broadcast_to(np.asarray(hi, float), 2)
+        if np.any(self.hi <= self.lo):
+            raise ValueError("need lo < hi")
+
+    def __call__(self, x):
+        lo, hi = self.lo.astype(x.dtype), self.hi.astype(x.dtype)
+        if self.mode == "reflecting":
+            _fold(x, lo, hi)
+        elif self.mode == "periodic":
+            np.subtract(x, lo, out=x)
+            np.mod(x, hi - lo, out=x)
+            np.add(x, lo, out=x)
+        else:
+            # (x - lo) * (hi - x) >= 0 in both coordinates
+            s = self.scratch(x, 4)
+            np.subtract(x, lo, out=s[:, :2])
+            np.subtract(hi, x, out=s[:, 2:])
+            np.multiply(s[:, :2], s[:, 2:], out=s[:, :2])
+            np.minimum(s[:, :1], s[:, 1:2], out=s[:, :1])
+            self._absorb(x, s[:, :1])
+
+class Disk(_Boundary):
+    """the disk of the given radius around center; reflection folds the distance to the center"""
+    def __init__(self, center, radius, mode="reflecting") -> None:
+        super().__init__(mode)
+        if mode == "periodic":
+            raise ValueError("a disk has no periodic boundary")
+        if radius <= 0:
+            raise ValueError("need radius > 0")
+        self.center = np.broadcast_to(np.asarray(center, float), 2)
+        self.radius = radius
+
+    def __call__(self, x):
+        center = self.center.astype(x.dtype)
+        s = self.scratch(x, 2)
+        r, scale = s[:, :1], s[:, 1:]
+        np.subtract(x, center, out=x)
+        np.hypot(x[:, :1], x[:, 1:], out=r)
+        if self.mode == "reflecting":
+            # scale x - center by folded(r) / r; folded(r) = r inside, so 0 < r is all that is needed
+            np.copyto(scale, r)
+            _fold(scale, 0, self.radius)
+            np.maximum(r, np.finfo(x.dtype).tiny, out=r)
+            np.divide(scale, r, out=scale)
+            np.multiply(x, scale, out=x)
+        else:
+            # radius^2 - r^2 >= 0
+            np.multiply(r, r, out=r)
+            np.subtract(self.radius ** 2, r, out=r)
+            self._absorb(x, r)
+        np.add(x, center, out=x)
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Simulate Brownian particles in a box and animate them.")
+    parser.add_argument("--particles", type=int, default=400)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--dt", type=float, default=0.02)
+    parser.add_argument("--drift", type=float, default=0.0, help="strength of the pull -drift*x to the origin")
+    parser.add_argument("--diffusion", type=float, default=1.0)
+    parser.add_argument("--boundary", choices=BOUNDARY_MODES, default="reflecting",
+                        help="walls of the box [-5, 5]^2")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default="brownian_motion.gif", help=".gif or .mp4, empty to skip")
+    parser.add_argument("--show", action="store_true", help="also play the animation in a matplotlib window")
+    args = parser.parse_args(argv)
+
+    # Initialize particles in Gaussian distribution in top-left corner
+    rng = np.random.default_rng(args.seed)
+    initial = rng.normal((-3, 3), 0.5, (args.particles, 2))
+    dt = args.dt
+
+    def frames(every=1):
+        # a fresh generator with the same seed, so every pass sees the same trajectories
+        return brownian_frames(initial, args.steps, dt, drift=lambda x: -args.drift * x, diffusion=args.diffusion,
+                               boundary=Box(-5, 5, args.boundary), every=every,
+                               rng=np.random.default_rng(args.seed + 1))
+
+    # Statistics pull frames lazily as well, e.g. the spread of the cloud over time
+    for step, x in frames(every=max(args.steps // 4, 1)):
+        print(f"t={step * dt:5.2f}s  n={np.sum(~np.isnan(x[:, 0]))}  mean=({np.nanmean(x[:, 0]):5.2f}, {np.nanmean(x[:, 1]):5.2f})  "
+              f"std={np.nanstd(x, axis=0).mean():.2f}")
+
+    if args.show:
+        import matplotlib.pyplot as plt
+        import matplotlib.animation as animation
+
+        fig, ax = plt.subplots(figsize=(8, 8))
+        ax.set_xlim(-5, 5)
+        ax.set_ylim(-5, 5)
+        ax.set_aspect('equal')
+        ax.grid(True, alpha=0.3)
+        scat = ax.scatter(initial[:, 0], initial[:, 1], s=50, alpha=0.7, c=range(args.particles), cmap='viridis')
+        # Add time text in bottom right corner
+        time_text = ax.text(0.95, 0.05, '', transform=ax.transAxes, fontsize=12,
+                            verticalalignment='bottom', horizontalalignment='right',
+                            bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+
+        def animate(frame):
+            step, x = frame
+            scat.set_offsets(x)
+            time_text.set_text(f'Time: {step * dt:.2f}s')
+            return scat, time_text
+
+        # 1 second simulated time = 1 second real time: each frame represents dt seconds.
+        # Frames are pulled from the simulator as they are drawn, nothing is stored
+        anim = animation.FuncAnimation(fig, animate, frames=frames, save_count=args.steps, cache_frame_data=False,
+                                       interval=dt * 1000, blit=True, repeat=True)
+        plt.show()
+
+    if args.output:
+        # frames are rasterized straight into image buffers in a process pool rather than redrawn by
+        # matplotlib. fps = 1 / dt plays back in real time; .mp4 files are much smaller
+        from matplotlib import colormaps
+        from .frame_render import Canvas, ParticleFrame, render
+
+        canvas = Canvas((-5, 5), (-5, 5), (800, 800))
+        background = canvas.blank()
+        canvas.grid(background, 2.0)
+        colors = (colormaps['viridis'](np.linspace(0, 1, args.particles))[:, :3] * 255).astype(np.uint8)
+        render(args.output, ((f'Time: {step * dt:.2f}s', x.copy()) for step, x in frames()),
+               ParticleFrame(canvas, background, colors, size=5), fps=1 / dt)
+
+if __name__ == "__main__":
+    main()
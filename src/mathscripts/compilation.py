@@ -0,0 +1,46 @@
+"""Fewer compilations for the JAX kernels: a persistent compilation cache and bucketed shapes.
+
+jit specializes on array shapes, so every new number of observations, particles or samples traces
+and compiles again, and every new process starts with nothing compiled. enable_cache keeps the
+compiled programs in a directory shared by all processes. pad_to_bucket pads an axis to one of a
+few sizes and returns a weight, 1 on the real rows and 0 on the padding, so that runs of nearby
+sizes share one program; the kernels that take such a weight leave the padding out of every mean.
+
+    enable_cache()                                 # before the first call of a jitted function
+    Y, y_weight = pad_to_bucket(Y)                 # (n, 2) -> (bucket(n), 2), (bucket(n),)
+"""
+import os
+
+import jax
+import jax.numpy as jnp
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mathscripts", "jax")
+
+def enable_cache(cache_dir=None, min_compile_time=0.0):
+    """store compiled programs in cache_dir (default $JAX_COMPILATION_CACHE_DIR, else DEFAULT_CACHE_DIR)
+    and load them from there in later processes. programs that compile in less than min_compile_time
+    seconds are not stored. returns the directory"""
+    cache_dir = cache_dir or os.environ.get("JAX_COMPILATION_CACHE_DIR") or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    jax.config.update("jax_compilation_cache_dir", cache_dir)
+    jax.config.update("jax_persistent_cache_min_compile_time_secs", min_compile_time)
+    jax.config.update("jax_persistent_cache_min_entry_size_bytes", 0)
+    return cache_dir
+
+def bucket(n, minimum=16):
+    """smallest size >= n of the form 2^k or 3*2^k, at least minimum. the padding is less than a third
+    of the bucket, and a sweep over n from 1 to N compiles about 2*log2(N) programs"""
+    n = max(n, minimum, 1)
+    size = 1 << (n - 1).bit_length()        # power of two >= n
+    return 3 * size // 4 if size >= 4 and 3 * size // 4 >= n else size
+
+def pad_to_bucket(a, minimum=16, axis=0):
+    """pad axis of a with zeros to bucket(a.shape[axis]). returns the padded array and the weight,
+    1.0 for the original entries and 0.0 for the padding, shape (bucket,)"""
+    a = jnp.asarray(a)
+    n = a.shape[axis]
+    size = bucket(n, minimum)
+    widths = [(0, 0)] * a.ndim
+    widths[axis] = (0, size - n)
+    dtype = a.dtype if jnp.issubdtype(a.dtype, jnp.floating) else jnp.float32
+    return jnp.pad(a, widths), (jnp.arange(size) < n).astype(dtype)
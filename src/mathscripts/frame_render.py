@@ -0,0 +1,226 @@
+"""Render particle animations straight into image buffers and encode them to GIF or MP4.
+
+Instead of redrawing a matplotlib figure for every frame, a Canvas maps data coordinates to
+pixels and draws points by writing into a uint8 (height, width, 3) array. Static layers (data
+clouds, circles, grid lines) are drawn once into a background that every frame copies.
+Frames are drawn, and for GIF quantized, in a pool of processes and streamed in order to the
+encoder: pillow for .gif, an ffmpeg pipe for .mp4.
+
+    canvas = Canvas((-5, 5), (-5, 5), (600, 600))
+    background = canvas.blank()
+    canvas.grid(background, 1.0)
+    render("out.gif", ((f"t={i}", x) for i, x in enumerate(frames)),
+           ParticleFrame(canvas, background, (0, 0, 255)), fps=30)
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+class Canvas:
+    """the rectangle xlim x ylim drawn on size = (width, height) pixels"""
+    def __init__(self, xlim, ylim, size=(600, 600), background=(255, 255, 255)) -> None:
+        self.xlim, self.ylim = xlim, ylim
+        self.width, self.height = size
+        self.background = np.asarray(background, np.uint8)
+
+    def blank(self):
+        image = np.empty((self.height, self.width, 3), np.uint8)
+        image[:] = self.background
+        return image
+
+    def to_pixels(self, points):
+        """(row, col) float pixel coordinates of (n, 2) points"""
+        points = np.asarray(points, float)
+        (x0, x1), (y0, y1) = self.xlim, self.ylim
+        col = (points[:, 0] - x0) * (self.width / (x1 - x0))
+        row = (y1 - points[:, 1]) * (self.height / (y1 - y0))
+        return row, col
+
+    def pixel_index(self, points, offset=(0, 0)):
+        """flat pixel index of every point shifted by offset pixels, -1 for points off the canvas or NaN"""
+        row, col = self.to_pixels(points)
+        row, col = np.floor(row) + offset[0], np.floor(col) + offset[1]
+        inside = (row >= 0) & (row < self.height) & (col >= 0) & (col < self.width)
+        return np.where(inside, np.where(inside, row, 0).astype(np.intp) * self.width
+                        + np.where(inside, col, 0).astype(np.intp), -1)
+
+    def points(self, image, points, color, size=1, alpha=1.0):
+        """draw points as size x size squares; color is one RGB triple or one per point"""
+        flat = image.reshape(-1, 3)
+        color = np.asarray(color, float)
+        for dr in range(-(size // 2), size - size // 2):
+            for dc in range(-(size // 2), size - size // 2):
+                idx = self.pixel_index(points, (dr, dc))
+                keep = idx >= 0
+                c = color[keep] if color.ndim == 2 else color
+                if alpha == 1.0:
+                    flat[idx[keep]] = c
+                else:
+                    flat[idx[keep]] = flat[idx[keep]] * (1 - alpha) + c * alpha
+
+    def density(self, image, points, color, alpha=0.2):
+        """draw many points as 1-pixel dots of opacity alpha stacked on each other, via a histogram:
+        a pixel hit k times gets opacity 1 - (1 - alpha)^k"""
+        idx = self.pixel_index(points)
+        counts = np.bincount(idx[idx >= 0], minlength=self.width * self.height)
+        opacity = (1 - (1 - alpha) ** counts.reshape(self.height, self.width))[..., None]
+        image[:] = image * (1 - opacity) + np.asarray(color, float) * opacity
+
+    def circle(self, image, center, radius, color, width=2):
+        """draw the outline of a circle, width in pixels"""
+        rows, cols = np.mgrid[:self.height, :self.width] + 0.5
+        (x0, x1), (y0, y1) = self.xlim, self.ylim
+        px = (x1 - x0) / self.width
+        x = x0 + cols * px
+        y = y1 - rows * (y1 - y0) / self.height
+        ring = np.abs(np.hypot(x - center[0], y - center[1]) - radius) <= width / 2 * px
+        image[ring] = color
+
+    def grid(self, image, spacing, color=(220, 220, 220)):
+        """draw lines at the multiples of spacing"""
+        (x0, x1), (y0, y1) = self.xlim, self.ylim
+        for x in np.arange(np.ceil(x0 / spacing), np.floor(x1 / spacing) + 1) * spacing:
+            col = int((x - x0) * self.width / (x1 - x0))
+            image[:, min(col, self.width - 1)] = color
+        for y in np.arange(np.ceil(y0 / spacing), np.floor(y1 / spacing) + 1) * spacing:
+            row = int((y1 - y) * self.height / (y1 - y0))
+            image[min(row, self.height - 1), :] = color
+
+    font_size = 14
+
+    def text(self, image, text, corner="bottom right", color=(0, 0, 0), margin=8):
+        pil = Image.fromarray(image)
+        draw = ImageDraw.Draw(pil)
+        font = ImageFont.load_default(self.font_size)
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        x = self.width - margin - (right - left) if "right" in corner else margin
+        y = self.height - margin - (bottom - top) if "bottom" in corner else margin
+        draw.rectangle((x - 3, y - 3 + top, x + right - left + 3, y + bottom + 3), fill=(255, 255, 255))
+        draw.text((x, y), text, fill=tuple(color), font=font)
+        image[:] = np.asarray(pil)
+
+class ParticleFrame:
+    """draw frames given as (label, points): the points over a copy of background, the label in a corner"""
+    def __init__(self, canvas, background, color, size=3, alpha=1.0, corner="bottom right") -> None:
+        self.canvas, self.background = canvas, background
+        self.color, self.size, self.alpha, self.corner = color, size, alpha, corner
+
+    def __call__(self, frame):
+        label, points = frame
+        image = self.background.copy()
+        self.canvas.points(image, points, self.color, self.size, self.alpha)
+        if label:
+            self.canvas.text(image, label, self.corner)
+        return image
+
+# ----- drawing and encoding in worker processes -----
+_draw = _format = None
+
+def _init_worker(draw, fmt):
+    # the draw function, with its background, is sent once per worker rather than with every chunk
+    global _draw, _format
+    _draw, _format = draw, fmt
+
+def _encode(image, fmt):
+    if fmt == "gif":
+        # quantize in the worker; the encoder then only compresses
+        image = Image.fromarray(image).quantize(256, method=Image.Quantize.FASTOCTREE)
+        return image.size, image.tobytes(), image.getpalette()
+    return image
+
+def _encode_chunk(frames):
+    return [_encode(_draw(frame), _format) for frame in frames]
+
+def default_start_method():
+    """how to start the drawing processes. forking a process that runs threads, as JAX does, can
+    deadlock the children, so they are spawned. a spawned worker imports __main__ again, which runs
+    a script started by path once more in every worker unless it is guarded by
+    if __name__ == "__main__"; for such scripts this returns "fork" if JAX is not loaded, and None
+    (draw in this process) if it is. modules run with -m and interactive sessions are spawned"""
+    main = sys.modules.get("__main__")
+    if getattr(main, "__spec__", None) is not None or getattr(main, "__file__", None) is None:
+        return "spawn"
+    return None if "jax" in sys.modules else "fork"
+
+def encoded_frames(frames, draw, fmt, workers=None, chunksize=8, start_method=None):
+    """yield draw(frame) for every frame in order: the image for fmt='raw', and its size, palette
+    indices and palette after quantizing for fmt='gif'.
+
+    draw has to be picklable (a module-level function or an object like ParticleFrame). At most
+    2*workers chunks of frames are in flight, so frames are pulled from the iterable lazily.
+    workers=1 draws in this process. start_method is a multiprocessing start method, by default
+    default_start_method(); pass "spawn" from a script guarded by if __name__ == "__main__".
+    """
+    frames = iter(frames)
+    chunks = iter(lambda: list(islice(frames, chunksize)), [])
+    start_method = start_method or default_start_method()
+    if workers == 1 or start_method is None:
+        for chunk in chunks:
+            yield from (_encode(draw(frame), fmt) for frame in chunk)
+        return
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method),
+                             initializer=_init_worker, initargs=(draw, fmt)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_encode_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        for future in pending:
+            yield from future.result()
+
+def render(path, frames, draw, fps, *, workers=None, chunksize=8, start_method=None, bitrate=None,
+           ffmpeg="ffmpeg"):
+    """draw every frame and write the animation to path, a .gif (pillow) or .mp4 (ffmpeg, needs even
+    width and height). frames must not be modified after they are yielded, since they are drawn
+    later in other processes. return the number of frames written"""
+    fmt = os.path.splitext(path)[1].lower()
+    if fmt == ".gif":
+        count = 0
+
+        def decoded():
+            nonlocal count
+            for size, data, palette in encoded_frames(frames, draw, "gif", workers, chunksize, start_method):
+                image = Image.frombytes("P", size, data)
+                image.putpalette(palette)
+                count += 1
+                yield image
+
+        stream = decoded()
+        first = next(stream, None)
+        if first is None:
+            return 0
+        # pillow keeps the (1 byte per pixel) frames until it has written them all
+        first.save(path, save_all=True, append_images=stream, duration=1000 / fps, loop=0)
+        return count
+    if fmt == ".mp4":
+        if shutil.which(ffmpeg) is None:
+            raise RuntimeError(f"{ffmpeg} not found, it is needed to write {path}")
+        process = None
+        count = 0
+        try:
+            for image in encoded_frames(frames, draw, "raw", workers, chunksize, start_method):
+                if process is None:
+                    height, width, _ = image.shape
+                    args = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                            "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                            "-vcodec", "libx264", "-pix_fmt", "yuv420p"]
+                    args += ["-b:v", f"{bitrate}k"] if bitrate else []
+                    process = subprocess.Popen(args + [path], stdin=subprocess.PIPE)
+                process.stdin.write(image.tobytes())
+                count += 1
+        finally:
+            if process is not None:
+                process.stdin.close()
+                if process.wait():
+                    raise RuntimeError(f"{ffmpeg} exited with status {process.returncode}")
+        return count
+    raise ValueError(f"can only write .gif and .mp4, not {path}")
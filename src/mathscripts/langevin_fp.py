@@ -0,0 +1,322 @@
+"""Langevin dynamics against the deterministic Fokker–Planck ODE in 1-D.
+
+Langevin SDE:   dX_t = -X_t dt + sqrt(2) dB_t
+FP ODE:         dX_t = (-1 + 1/var(t)) X_t dt,  var(t) the variance of f_t
+
+Both start from N(0, var0), so f_t = N(0, var(t)) and KL(f_t || N(0,1)) is known exactly. The
+steppers, the fused simulate scan, the vmapped ensemble and the integrator error measurements
+are here. Run:  langevin-fp --particles 10000 --dt 0.01 --t-max 2.5
+"""
+from __future__ import annotations
+import os
+from functools import partial
+import jax
+import jax.numpy as jnp
+import numpy as np
+from jax import lax
+
+from .compilation import enable_cache, pad_to_bucket
+
+# grid for the KDEs and KL integrals, and N(0,1) on it. numpy arrays, so that they take the float
+# width jax is set to when a function using them is traced
+GRID = np.linspace(-10.0, 10.0, 1001)
+DX = GRID[1] - GRID[0]
+q_grid = np.exp(-0.5 * GRID ** 2) / np.sqrt(2 * np.pi)
+
+# ----- helper functions -----
+@jax.jit
+def sigma(t: float | jnp.ndarray) -> jnp.ndarray:  # variance, not std
+    return 1.0 - jnp.exp(-2.0 * (t + 0.1))
+
+# variance at time t of the Langevin/FP flow started from N(0, var0); sigma(t) is variance(t, sigma(0))
+@jax.jit
+def variance(t: float | jnp.ndarray, var0: float | jnp.ndarray) -> jnp.ndarray:
+    return 1.0 + (var0 - 1.0) * jnp.exp(-2.0 * t)
+
+@jax.jit
+def kl_div(p: jnp.ndarray, q: jnp.ndarray, dx: float) -> float:
+    p_safe = jnp.clip(p, 1e-12, None)
+    q_safe = jnp.clip(q, 1e-12, None)
+    return jnp.sum(p_safe * jnp.log(p_safe / q_safe)) * dx
+
+# Ground‑truth KL between N(0, sigma(t)) and N(0,1)
+@jax.jit
+def kl_gauss_sigma(s2: jnp.ndarray) -> jnp.ndarray:
+    return 0.5 * (s2 - 1.0 - jnp.log(s2))
+
+# ----- binned KDE -----
+@jax.jit
+def binned_kde(x: jnp.ndarray, grid: jnp.ndarray, weight: jnp.ndarray | None = None) -> jnp.ndarray:
+    """Gaussian KDE of the samples x on a uniform grid, with the bandwidth of gaussian_kde (Scott's rule).
+
+    The samples are linearly binned onto the grid and the bin weights convolved with the
+    kernel by FFT, so an evaluation costs O(N + G log G) instead of O(N G).
+    Samples outside the grid are dropped. With the grid and particle counts used here the
+    result agrees with gaussian_kde(x).pdf(grid) to about 1e-3 relative to the peak density.
+    weight, 1 on real and 0 on padded samples (see compilation.pad_to_bucket), leaves the padding
+    out of the bandwidth and the density.
+    """
+    n_grid = grid.shape[0]
+    dx = grid[1] - grid[0]
+    if weight is None:
+        n, weight = x.shape[0], 1.0
+        h = jnp.std(x, ddof=1) * n ** (-1 / 5)
+    else:
+        n = weight.sum()
+        mean = jnp.sum(weight * x) / n
+        h = jnp.sqrt(jnp.sum(weight * (x - mean) ** 2) / (n - 1)) * n ** (-1 / 5)
+
+    # linear binning: each sample splits its unit mass between the two nearest grid points
+    pos = (x - grid[0]) / dx
+    i = jnp.floor(pos).astype(jnp.int32)
+    w = pos - i
+    inside = (i >= 0) & (i < n_grid - 1)
+    i = jnp.where(inside, i, 0)
+    counts = jnp.zeros(n_grid, x.dtype)
+    counts = counts.at[i].add(jnp.where(inside, (1 - w) * weight, 0.0))
+    counts = counts.at[i + 1].add(jnp.where(inside, w * weight, 0.0))
+
+    # kernel at offsets -(G-1)..(G-1) grid points; the middle G entries of the full convolution
+    offsets = jnp.arange(-(n_grid - 1), n_grid) * dx
+    kernel = jnp.exp(-0.5 * (offsets / h) ** 2) / (h * jnp.sqrt(2 * jnp.pi) * n)
+    n_fft = 1 << (3 * n_grid - 3).bit_length()
+    full = jnp.fft.irfft(jnp.fft.rfft(counts, n_fft) * jnp.fft.rfft(kernel, n_fft), n_fft)
+    return full[n_grid - 1 : 2 * n_grid - 1]
+
+# ----- Langevin integrators: x_next = step(x, noise, dt) with noise ~ N(0, 1) -----
+def euler_maruyama(x, noise, dt):
+    return x + (-x) * dt + jnp.sqrt(2.0 * dt) * noise
+
+def stochastic_heun(x, noise, dt):
+    # predictor-corrector on the drift; the noise is additive, so both stages share it
+    pred = euler_maruyama(x, noise, dt)
+    return x - 0.5 * (x + pred) * dt + jnp.sqrt(2.0 * dt) * noise
+
+def exact_ou(x, noise, dt):
+    # the Ornstein–Uhlenbeck transition is Gaussian and known in closed form
+    return jnp.exp(-dt) * x + jnp.sqrt(1.0 - jnp.exp(-2.0 * dt)) * noise
+
+LANGEVIN_METHODS = {"euler": euler_maruyama, "heun": stochastic_heun, "exact": exact_ou}
+
+@partial(jax.jit, static_argnames="method")
+def langevin_step(x: jnp.ndarray, key: jax.random.KeyArray, dt: float,
+                  method: str = "euler") -> tuple[jnp.ndarray, jax.random.KeyArray]:
+    key, sub = jax.random.split(key)
+    noise = jax.random.normal(sub, x.shape)
+    return LANGEVIN_METHODS[method](x, noise, dt), key
+
+# ----- FP ODE integrators: x_next = step(f, t, x, dt) for dx/dt = f(t, x) -----
+def fp_drift(t, x, var0):
+    return (-1.0 + 1/variance(t, var0)) * x
+
+def euler(f, t, x, dt):
+    return x + f(t, x) * dt
+
+def rk4(f, t, x, dt):
+    k1 = f(t, x)
+    k2 = f(t + dt/2, x + dt/2 * k1)
+    k3 = f(t + dt/2, x + dt/2 * k2)
+    k4 = f(t + dt, x + dt * k3)
+    return x + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
+
+FP_METHODS = {"euler": euler, "rk4": rk4}
+
+@partial(jax.jit, static_argnames="method")
+def fp_step(x: jnp.ndarray, t: float, dt: float, var0: float, method: str = "euler") -> jnp.ndarray:
+    return FP_METHODS[method](partial(fp_drift, var0=var0), t, x, dt)
+
+# Dormand–Prince 5(4) tableau
+DP_C = (0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0)
+DP_A = ((),
+        (1/5,),
+        (3/40, 9/40),
+        (44/45, -56/15, 32/9),
+        (19372/6561, -25360/2187, 64448/6561, -212/729),
+        (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+        (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84))
+DP_E = (71/57600, 0.0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)  # 5th minus 4th order weights
+
+def dopri5(f, t, x, dt):
+    """one Dormand–Prince step, return the 5th order solution and the error estimate"""
+    ks = []
+    for c, a in zip(DP_C, DP_A):
+        ks.append(f(t + c*dt, x + dt * sum(a_j * k for a_j, k in zip(a, ks))))
+    # the last stage is evaluated at the 5th order solution (first same as last)
+    x_next = x + dt * sum(a_j * k for a_j, k in zip(DP_A[-1], ks))
+    return x_next, dt * sum(e * k for e, k in zip(DP_E, ks))
+
+@jax.jit
+def fp_solve_adaptive(x0: jnp.ndarray, times: jnp.ndarray, var0: float, rtol: float = 1e-6, atol: float = 1e-9):
+    """Integrate the FP ODE from times[0] with adaptive RK45 and return the states at times, (len(times), N),
+    with the number of accepted and rejected steps. Steps are shortened to land on every output time."""
+    f = partial(fp_drift, var0=var0)
+
+    def advance(carry, t_end):
+        def body(c):
+            x, t, dt, accepted, rejected = c
+            h = jnp.minimum(dt, t_end - t)
+            x_new, err = dopri5(f, t, x, h)
+            scale = atol + rtol * jnp.maximum(jnp.abs(x), jnp.abs(x_new))
+            e = jnp.sqrt(jnp.mean((err / scale) ** 2))
+            ok = e <= 1.0
+            dt_next = jnp.where(ok & (h < dt), dt, h * jnp.clip(0.9 * e ** (-1/5), 0.2, 5.0))
+            return (jnp.where(ok, x_new, x), jnp.where(ok, t + h, t), dt_next, accepted + ok, rejected + ~ok)
+        carry = lax.while_loop(lambda c: c[1] < t_end - 1e-12, body, carry)
+        return carry, carry[0]
+
+    init = (x0, times[0], jnp.asarray(1e-3, x0.dtype), 0, 0)
+    (_, _, _, accepted, rejected), xs = lax.scan(advance, init, times[1:])
+    return jnp.concatenate([x0[None], xs]), accepted, rejected
+
+# ----- integrator error against the exact Gaussian KL -----
+# every scheme above is linear in (x, noise), so started from N(0, var0) the particles stay Gaussian
+# and their variance follows a recursion; comparing its KL with kl_gauss_sigma isolates the
+# discretisation error from the sampling and KDE error.
+@partial(jax.jit, static_argnames=("method", "num_steps"))
+def langevin_kl_error(method: str, dt: float, num_steps: int, var0: float) -> jnp.ndarray:
+    """max over steps of |KL of the scheme's law - exact KL|"""
+    step = LANGEVIN_METHODS[method]
+    a, b = step(1.0, 0.0, dt), step(0.0, 1.0, dt)
+    def body(var, i):
+        err = jnp.abs(kl_gauss_sigma(var) - kl_gauss_sigma(variance(i * dt, var0)))
+        return a**2 * var + b**2, err
+    return jnp.max(lax.scan(body, jnp.asarray(var0, float), jnp.arange(num_steps + 1))[1])
+
+@partial(jax.jit, static_argnames=("method", "num_steps"))
+def fp_kl_error(method: str, dt: float, num_steps: int, var0: float) -> jnp.ndarray:
+    """max over steps of |KL of the scheme's law - exact KL|; the flow maps x_0 to c_t x_0"""
+    def body(c, i):
+        err = jnp.abs(kl_gauss_sigma(var0 * c**2) - kl_gauss_sigma(variance(i * dt, var0)))
+        return fp_step(c, i * dt, dt, var0, method), err
+    return jnp.max(lax.scan(body, jnp.asarray(1.0, float), jnp.arange(num_steps + 1))[1])
+
+# ----- both systems in one compiled scan -----
+@partial(jax.jit, static_argnames=("num_steps", "langevin_method", "fp_method"))
+def simulate(x0: jnp.ndarray, key: jax.random.KeyArray, save_indices: jnp.ndarray, num_steps: int, dt: float,
+             var0: float, langevin_method: str = "euler", fp_method: str = "euler", weight: jnp.ndarray | None = None):
+    """Run Langevin and FP particles from x0 ~ N(0, var0) for num_steps steps of size dt,
+    with the integrators named by langevin_method and fp_method.
+
+    The KL to N(0,1) of both KDEs and the exact Gaussian KL are computed on device at every
+    step 0..num_steps; the particles are kept only at the (sorted) save_indices.
+    Returns (langevin_samples, fp_samples), each (len(save_indices), N), and
+    (kl_langevin, kl_fp, kl_true), each (num_steps + 1,).
+
+    For x0 padded to a bucketed size, weight masks the padded particles out of the KDEs. The
+    integrators act on every particle separately, so the padding never reaches the real ones.
+    """
+    num_saves = save_indices.shape[0]
+
+    def body(carry, i):
+        x_l, x_f, key, snaps_l, snaps_f = carry
+        t = i * dt
+        slot = jnp.minimum(jnp.searchsorted(save_indices, i), num_saves - 1)
+        hit = save_indices[slot] == i
+        snaps_l = lax.cond(hit, lambda: snaps_l.at[slot].set(x_l), lambda: snaps_l)
+        snaps_f = lax.cond(hit, lambda: snaps_f.at[slot].set(x_f), lambda: snaps_f)
+        kl = (kl_div(binned_kde(x_l, GRID, weight), q_grid, DX),
+              kl_div(binned_kde(x_f, GRID, weight), q_grid, DX),
+              kl_gauss_sigma(variance(t, var0)))
+        x_l, key = langevin_step(x_l, key, dt, langevin_method)
+        x_f = fp_step(x_f, t, dt, var0, fp_method)
+        return (x_l, x_f, key, snaps_l, snaps_f), kl
+
+    snaps = jnp.zeros((num_saves,) + x0.shape, x0.dtype)
+    # the step after the last KL is computed but discarded
+    carry, kls = lax.scan(body, (x0, x0, key, snaps, snaps), jnp.arange(num_steps + 1))
+    return carry[3:], kls
+
+# ----- ensembles over seeds, step sizes and initial variances -----
+@partial(jax.jit, static_argnames=("n_particles", "num_steps"))
+def _ensemble(keys, dts, var0s, n_particles, num_steps, weight=None):
+    def run(key, dt, var0):
+        key, k0 = jax.random.split(key)
+        x0 = jnp.sqrt(var0) * jax.random.normal(k0, (n_particles,))
+        _, kls = simulate(x0, key, jnp.zeros(1, int), num_steps, dt, var0, weight=weight)
+        return jnp.stack(kls)
+    run = jax.vmap(run, (0, None, None))     # seeds
+    run = jax.vmap(run, (None, None, 0))     # initial variances
+    return jax.vmap(run, (None, 0, None))(keys, dts, var0s)  # step sizes
+
+def ensemble(key, n_seeds, dts, var0s, *, n_particles, t_max, bucket=False):
+    """Run the experiment for n_seeds seeds at every step size in dts and initial variance in var0s,
+    as one compiled batch. bucket=True runs compilation.bucket(n_particles) particles with the extra
+    ones masked out, so that nearby particle counts share the compiled program; the random draws then
+    differ from an unbucketed run.
+
+    All runs take the number of steps the smallest dt needs to reach t_max; values past t_max are NaN.
+    Returns times (len(dts), num_steps + 1) and
+    kl (len(dts), len(var0s), n_seeds, 3, num_steps + 1) with Langevin, FP and exact KL along axis 3.
+    """
+    dts, var0s = jnp.asarray(dts), jnp.asarray(var0s)
+    num_steps = int(round(t_max / float(dts.min())))
+    weight = None
+    if bucket:
+        weight = pad_to_bucket(jnp.zeros(n_particles, dts.dtype))[1]
+        n_particles = weight.shape[0]
+    kl = _ensemble(jax.random.split(key, n_seeds), dts, var0s, n_particles, num_steps, weight)
+    times = dts[:, None] * jnp.arange(num_steps + 1)
+    kl = jnp.where(times[:, None, None, None, :] <= t_max + 1e-9, kl, jnp.nan)
+    return times, kl
+
+def neg_dkl_dt_ensemble(times, kl):
+    """−d/dt KL by forward differences for ensemble output, at the midpoint times"""
+    dt = (times[:, 1] - times[:, 0])[:, None, None, None, None]
+    return (times[:, 1:] + times[:, :-1]) / 2, -(kl[..., 1:] - kl[..., :-1]) / dt
+
+def bands(values, z=1.96):
+    """mean over the seed axis (2) and the normal confidence interval of that mean"""
+    mean = jnp.mean(values, axis=2)
+    half = z * jnp.std(values, axis=2, ddof=1) / jnp.sqrt(values.shape[2])
+    return mean, mean - half, mean + half
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare Langevin particles with the Fokker–Planck ODE in 1-D.")
+    parser.add_argument("--particles", type=int, default=10_000)
+    parser.add_argument("--dt", type=float, default=0.01)
+    parser.add_argument("--t-max", type=float, default=2.5)
+    parser.add_argument("--var0", type=float, default=None, help="initial variance (default: sigma(0))")
+    parser.add_argument("--langevin", choices=list(LANGEVIN_METHODS), default="euler")
+    parser.add_argument("--fp", choices=list(FP_METHODS), default="euler")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--float32", action="store_true", help="compute in single precision")
+    parser.add_argument("--cache-dir", default=None,
+                        help="keep compiled programs here for later runs (default: $JAX_COMPILATION_CACHE_DIR)")
+    parser.add_argument("--bucket", action="store_true",
+                        help="pad the particles to a bucketed count, so that nearby counts reuse compiled programs")
+    parser.add_argument("--plot", action="store_true", help="plot the KL curves with matplotlib")
+    args = parser.parse_args(argv)
+
+    jax.config.update("jax_enable_x64", not args.float32)
+    if args.cache_dir or os.environ.get("JAX_COMPILATION_CACHE_DIR"):
+        enable_cache(args.cache_dir)
+    var0 = float(sigma(0.0)) if args.var0 is None else args.var0
+    key, k0 = jax.random.split(jax.random.PRNGKey(args.seed))
+    x0 = jnp.sqrt(var0) * jax.random.normal(k0, (args.particles,))
+    num_steps = int(round(args.t_max / args.dt))
+    save_indices = jnp.arange(0, num_steps + 1, max(int(round(1.0 / args.dt)), 1))
+    x0, weight = pad_to_bucket(x0) if args.bucket else (x0, None)
+    _, kls = simulate(x0, key, save_indices, num_steps, args.dt, var0, args.langevin, args.fp, weight)
+    times = jnp.arange(num_steps + 1) * args.dt
+
+    print(f"{'t':>6} {'KL Langevin':>12} {'KL FP':>12} {'KL exact':>12}")
+    for i in save_indices.tolist():
+        print(f"{float(times[i]):6.2f} " + " ".join(f"{float(kl[i]):12.4e}" for kl in kls))
+    print(f"integrator error of the KL on [0, {args.t_max}]: Langevin {args.langevin} "
+          f"{float(langevin_kl_error(args.langevin, args.dt, num_steps, var0)):.2e}, "
+          f"FP {args.fp} {float(fp_kl_error(args.fp, args.dt, num_steps, var0)):.2e}")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        for kl, label in zip(kls, ("Langevin", "FP ODE", "True Gaussian")):
+            plt.plot(times, kl, label=label)
+        plt.xlabel("t")
+        plt.ylabel("KL(f_t || N(0,1))")
+        plt.yscale("log")
+        plt.legend(); plt.grid(True)
+        plt.show()
+
+if __name__ == "__main__":
+    main()
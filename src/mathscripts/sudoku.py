@@ -0,0 +1,384 @@
+from math import isqrt
+
+def is_valid(puzzle):
+    if len(puzzle) != 9:
+        print("Not 9 rows")
+        return False
+    num_values_given = 0
+    for r in range(9):
+        if len(puzzle[r]) != 9:
+            print("Not 9 columns")
+            return False
+        for c in range(9):
+            num_values_given += (puzzle[r][c] != 0)
+            if puzzle[r][c] not in range(0,9+1):
+                print(f"Wrong number at {(r,c)}")
+                return False
+    return num_values_given > 16
+
+ALL_DIGITS = (1 << 9) - 1  # bit d-1 set <=> digit d is a candidate
+FILLED = 1 << 9            # candidate mask of a cell that already holds a number
+NUMBERS = [tuple(num for num in range(1,9+1) if mask >> (num-1) & 1) for mask in range(FILLED + 1)]
+# popcount of every candidate mask; filled cells sort after any empty cell
+POPCOUNT = [len(nums) for nums in NUMBERS[:FILLED]] + [10]
+
+def box_of(row, col):
+    return (row//3)*3 + col//3
+
+# row, column and box of each cell, indexed by cell = 9*row + col
+ROW = [cell//9 for cell in range(81)]
+COL = [cell%9 for cell in range(81)]
+BOX = [box_of(row, col) for row, col in zip(ROW, COL)]
+
+# peers of each cell (same row, column or box)
+PEERS = [tuple(sorted({9*row + c for c in range(9)} | {9*r + col for r in range(9)}
+                      | {9*r + c for r in range(row//3*3, row//3*3+3) for c in range(col//3*3, col//3*3+3)}
+                      - {9*row + col}))
+         for row in range(9) for col in range(9)]
+# cells of every row, column and box
+UNITS = ([tuple(9*r + c for c in range(9)) for r in range(9)]
+         + [tuple(9*r + c for r in range(9)) for c in range(9)]
+         + [tuple(cell for cell in range(81) if BOX[cell] == b) for b in range(9)])
+
+def make_masks(puzzle):
+    """bitmasks of the digits already used in every row, column and box"""
+    rows, cols, boxes = [0]*9, [0]*9, [0]*9
+    for r, line in enumerate(puzzle):
+        for c, num in enumerate(line):
+            if num != 0:
+                bit = 1 << (num-1)
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[BOX[9*r + c]] |= bit
+    return rows, cols, boxes
+
+class Sudoku:
+    def __init__(self, puzzle) -> None:
+        self.grid = [int(num) for line in puzzle for num in line]
+        self.rows, self.cols, self.boxes = make_masks(puzzle)
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+        self.cands = [FILLED if num else ALL_DIGITS & ~(rows[r] | cols[c] | boxes[b])
+                      for num, r, c, b in zip(self.grid, ROW, COL, BOX)]
+        self.counts = list(map(POPCOUNT.__getitem__, self.cands))
+        # one entry per placed number: (old candidate mask of the cell, peers that lost the digit)
+        self.trail = []
+
+    @property
+    def puzzle(self):
+        return [self.grid[9*r:9*r+9] for r in range(9)]
+
+    def to_string(self):
+        """the grid as 81 digits, row by row, with 0 for empty cells"""
+        return ''.join(map(str, self.grid))
+
+    def is_solved(self):
+        return all(mask == ALL_DIGITS for mask in self.rows + self.cols + self.boxes)
+
+    def place_number(self, num, row, col):
+        cell, bit = 9*row + col, 1 << (num-1)
+        self.grid[cell] = num
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.boxes[BOX[cell]] |= bit
+        cands, counts = self.cands, self.counts
+        cleared = []
+        for p in PEERS[cell]:
+            if cands[p] & bit:
+                cands[p] ^= bit
+                counts[p] -= 1
+                cleared.append(p)
+        self.trail.append((cands[cell], cleared))
+        cands[cell], counts[cell] = FILLED, 10
+
+    def remove_number(self, num, row, col):
+        """undo the last place_number, which must have been place_number(num, row, col)"""
+        cell, bit = 9*row + col, 1 << (num-1)
+        self.grid[cell] = 0
+        self.rows[row] ^= bit
+        self.cols[col] ^= bit
+        self.boxes[BOX[cell]] ^= bit
+        cands, counts = self.cands, self.counts
+        cands[cell], cleared = self.trail.pop()
+        counts[cell] = POPCOUNT[cands[cell]]
+        for p in cleared:
+            cands[p] |= bit
+            counts[p] += 1
+
+    def allowed_numbers(self, row, col):
+        """return numbers that can go in (row, col) cell"""
+        return NUMBERS[self.cands[9*row + col]]
+
+    def num_allowed_numbers(self, row, col):
+        """return the number of values that can go in (row, col) cell"""
+        return POPCOUNT[self.cands[9*row + col] & ALL_DIGITS]
+
+    def choose_cell(self):
+        """choose the cell with smallest number of values that can go there, and a boolean that is True if the puzzle might still be solvable"""
+        counts = self.counts
+        shortest = min(counts)
+        if shortest == 10:  # no empty cells left
+            return (0, 0), False
+        return divmod(counts.index(shortest), 9), shortest != 0
+
+    def hidden_singles(self):
+        """return (cell, num) for every number that fits in only one cell of some row, column or box, and False if some number fits nowhere in a unit"""
+        cands, singles = self.cands, []
+        for unit, used in zip(UNITS, self.rows + self.cols + self.boxes):
+            once = twice = 0
+            for cell in unit:
+                mask = cands[cell] & ALL_DIGITS
+                twice |= once & mask
+                once |= mask
+            if (once | used) != ALL_DIGITS:
+                return singles, False
+            hidden = once & ~twice
+            if hidden:
+                for cell in unit:
+                    if cands[cell] & hidden:
+                        singles.append((cell, NUMBERS[cands[cell] & hidden][0]))
+        return singles, True
+
+    def propagate(self):
+        """place naked and hidden singles until there are none left.
+        return the trail of placements, to be undone with undo, and a boolean that is False if a contradiction was found"""
+        trail, counts, cands = [], self.counts, self.cands
+        while True:
+            # naked singles: cells with exactly one allowed number
+            while 1 in counts:
+                cell = counts.index(1)
+                num = NUMBERS[cands[cell]][0]
+                self.place_number(num, ROW[cell], COL[cell])
+                trail.append((num, ROW[cell], COL[cell]))
+            if 0 in counts:
+                return trail, False
+            singles, consistent = self.hidden_singles()
+            if not consistent:
+                return trail, False
+            if not singles:
+                return trail, True
+            for cell, num in singles:
+                if self.grid[cell] == num:  # hidden single of two units at once
+                    continue
+                if not cands[cell] >> (num-1) & 1:
+                    return trail, False
+                self.place_number(num, ROW[cell], COL[cell])
+                trail.append((num, ROW[cell], COL[cell]))
+
+    def undo(self, trail):
+        for num, row, col in reversed(trail):
+            self.remove_number(num, row, col)
+
+    def solve_recursive(self, solutions, rec_depth):
+        """return all possible solutions, as strings of 81 digits, appended to the solutions array"""
+        if rec_depth<=0 or len(solutions)==1:
+            # print(f"{(81-rec_depth)*' '}ran out of recursive depth")
+            return
+        
+        trail, consistent = self.propagate()
+        if consistent:
+            (best_row, best_col), has_valid_move = self.choose_cell()
+            if has_valid_move:
+                # after propagation every empty cell allows at least two numbers, so this is a real guess
+                for num in self.allowed_numbers(best_row, best_col):
+                    # print(f"{(81-rec_depth)*' '}guessing {num} at {(best_row,best_col)}")
+                    self.place_number(num, best_row, best_col)
+                    self.solve_recursive(solutions, rec_depth-1)
+                    self.remove_number(num, best_row, best_col)
+            elif self.is_solved():
+                # print(f"{(81-rec_depth)*' '}SOLVED with depth {rec_depth} left")
+                solutions.append(self.to_string())
+        self.undo(trail)
+
+class DancingLinks:
+    """exact cover (Knuth's Algorithm X with dancing links) over columns 0..num_cols-1.
+    nodes live in flat lists; node 0 is the root and nodes 1..num_cols are the column headers"""
+    def __init__(self, num_cols) -> None:
+        n = num_cols + 1
+        self.L = [i-1 for i in range(n)]
+        self.R = [i+1 for i in range(n)]
+        self.L[0], self.R[-1] = num_cols, 0
+        self.U = list(range(n))
+        self.D = list(range(n))
+        self.C = list(range(n))
+        self.S = [0]*n
+        self.row_of = [None]*n  # row label of every node
+        self.first_node = {}    # first node of the row with a given label
+        self.selected = set()   # columns covered by select
+
+    def add_row(self, cols, label):
+        """add a row covering the given columns"""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        first = len(C)
+        self.first_node[label] = first
+        for k, col in enumerate(cols):
+            header, node = col+1, first+k
+            L.append(node-1 if k else node)
+            R.append(first)
+            R[node-1 if k else node] = node
+            L[first] = node
+            U.append(U[header])
+            D.append(header)
+            D[U[header]] = node
+            U[header] = node
+            C.append(header)
+            S[header] += 1
+            self.row_of.append(label)
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]], L[R[c]] = R[c], L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]], U[D[j]] = D[j], U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = L[R[c]] = c
+
+    def select(self, label):
+        """force the row with this label into every solution; return False if it conflicts with earlier selections"""
+        node = j = self.first_node[label]
+        headers = []
+        while True:
+            headers.append(self.C[j])
+            j = self.R[j]
+            if j == node:
+                break
+        if self.selected.intersection(headers):
+            return False
+        self.selected.update(headers)
+        for h in headers:
+            self.cover(h)
+        return True
+
+    def search(self, partial=None):
+        """yield every exact cover as a list of row labels"""
+        partial = [] if partial is None else partial
+        R, D, C, S = self.R, self.D, self.C, self.S
+        if R[0] == 0:
+            yield list(partial)
+            return
+        # column with the fewest rows
+        best, c = R[0], R[R[0]]
+        while c != 0:
+            if S[c] < S[best]:
+                best = c
+            c = R[c]
+        if S[best] == 0:
+            return
+        self.cover(best)
+        r = D[best]
+        while r != best:
+            partial.append(self.row_of[r])
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+            yield from self.search(partial)
+            j = self.L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = self.L[j]
+            partial.pop()
+            r = D[r]
+        self.uncover(best)
+
+class ExactCoverSudoku:
+    """sudoku of any size n = k*k (9, 16, 25, ...) as an exact cover problem with 4*n*n constraints:
+    every cell holds one number, and every row, column and box holds every number once"""
+    links_class = DancingLinks
+
+    def __init__(self, puzzle) -> None:
+        n = len(puzzle)
+        k = isqrt(n)
+        if k*k != n or any(len(line) != n for line in puzzle):
+            raise ValueError(f"puzzle must be n x n with n a perfect square, got {n} rows")
+        self.n, self.k = n, k
+        self.puzzle = [[int(num) for num in line] for line in puzzle]
+        self.links = self.links_class(4*n*n)
+        for r in range(n):
+            for c in range(n):
+                b = (r//k)*k + c//k
+                for num in range(1, n+1):
+                    d = num-1
+                    self.links.add_row((r*n + c, n*n + r*n + d, 2*n*n + c*n + d, 3*n*n + b*n + d), (r, c, num))
+        self.consistent = all(self.links.select((r, c, num))
+                              for r, line in enumerate(self.puzzle) for c, num in enumerate(line) if num)
+
+    def solutions(self):
+        """yield every solution as a list of rows"""
+        if not self.consistent:
+            return
+        for labels in self.links.search():
+            grid = [line[:] for line in self.puzzle]
+            for r, c, num in labels:
+                grid[r][c] = num
+            yield grid
+
+    def solve(self):
+        """return the first solution, or None if there is none"""
+        return next(self.solutions(), None)
+
+    def count_solutions(self, limit=None):
+        """return the number of solutions, counting no further than limit. limit=2 checks uniqueness"""
+        count = 0
+        if not self.consistent:
+            return count
+        for _ in self.links.search():
+            count += 1
+            if count == limit:
+                break
+        return count
+
+def parse_puzzle(line):
+    """read a puzzle written as 81 characters row by row, with 0 or . for empty cells"""
+    line = line.strip()
+    if len(line) != 81:
+        raise ValueError(f"expected 81 characters, got {len(line)}: {line!r}")
+    digits = [0 if ch == '.' else int(ch) for ch in line]
+    return [digits[9*r:9*r+9] for r in range(9)]
+
+def sudoku_solver(puzzle):
+    print(f"Solving sudoku\n{puzzle}")
+    assert is_valid(puzzle)
+    sudoku = Sudoku(puzzle)
+    solutions = []
+    sudoku.solve_recursive(solutions, 81)
+    print(f"solutions:\n{solutions}")
+    assert len(solutions) == 1
+    # solve_recursive stops at the first solution; count up to 2 to see if it is the only one
+    num_solutions = ExactCoverSudoku(puzzle).count_solutions(limit=2)
+    print(f"unique solution: {num_solutions == 1}")
+    solution = parse_puzzle(solutions[0])
+    return solution
+
+puzzle_ = [
+[5, 0, 0, 0, 0, 0, 3, 0, 0], 
+[0, 6, 0, 8, 0, 2, 0, 4, 0], 
+[0, 0, 1, 0, 0, 0, 0, 0, 5], 
+[0, 1, 0, 3, 2, 0, 0, 7, 0], 
+[0, 0, 2, 0, 0, 4, 0, 0, 0], 
+[3, 0, 4, 0, 7, 0, 6, 0, 9], 
+[8, 0, 7, 0, 1, 0, 5, 0, 4], 
+[0, 0, 0, 5, 0, 0, 7, 0, 0], 
+[0, 5, 0, 0, 0, 7, 0, 3, 0]]
+
+if __name__ == "__main__":
+    import time
+    t1 = time.time()
+    sudoku_solver(puzzle_)
+    t2 = time.time()
+    print(f"Took {t2-t1} seconds")
\ No newline at end of file
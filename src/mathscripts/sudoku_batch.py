@@ -0,0 +1,119 @@
+"""Solve many sudokus in parallel.
+
+Puzzles are read in the common one-per-line format: 81 characters row by row,
+with 0 or . for empty cells. Solutions are written in the same format, with an
+empty line for a puzzle that has no solution and the line "invalid" for one that
+is not 81 digits or dots, so that one bad line does not stop the run.
+With --unordered each line is 'puzzle,solution' since the input order is lost.
+
+Run:  sudoku-batch puzzles.txt -o solutions.txt -j 8
+"""
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from .sudoku import Sudoku, parse_puzzle
+
+INVALID = "invalid"     # the result for a line that is not a puzzle
+
+def solve_string(line):
+    """solve one puzzle given as 81 characters, return the solution as 81 digits, '' if there is none,
+    or INVALID if the line is not a puzzle"""
+    try:
+        puzzle = parse_puzzle(line)
+    except ValueError:
+        return INVALID
+    solutions = []
+    Sudoku(puzzle).solve_recursive(solutions, 81)
+    return solutions[0] if solutions else ''
+
+def _solve_chunk(chunk):
+    return [solve_string(line) for line in chunk]
+
+def read_puzzles(lines):
+    """strip lines and skip empty ones and # comments, lazily"""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+def _chunks(puzzles, chunksize):
+    puzzles = iter(puzzles)
+    while chunk := list(islice(puzzles, chunksize)):
+        yield chunk
+
+def solve_many(puzzles, workers=None, chunksize=256, ordered=True):
+    """yield (puzzle, solution) pairs for an iterable of puzzle strings.
+
+    Puzzles are sent to a pool of `workers` processes in chunks of `chunksize`, with at most
+    2*workers chunks in flight, so the input is never held in memory as a whole.
+    With ordered=False pairs come out as soon as their chunk is done. workers=1 solves in this process.
+    """
+    chunks = _chunks(puzzles, chunksize)
+    if workers == 1:
+        for chunk in chunks:
+            yield from zip(chunk, _solve_chunk(chunk))
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as pool:
+        max_pending = 2 * workers
+        pending = deque() if ordered else set()
+        for chunk in chunks:
+            future = pool.submit(_solve_chunk, chunk)
+            future.chunk = chunk
+            if ordered:
+                pending.append(future)
+                if len(pending) >= max_pending:
+                    future = pending.popleft()
+                    yield from zip(future.chunk, future.result())
+            else:
+                pending.add(future)
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from zip(future.chunk, future.result())
+        if ordered:
+            for future in pending:
+                yield from zip(future.chunk, future.result())
+        else:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from zip(future.chunk, future.result())
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Solve sudokus given one per line as 81 characters.")
+    parser.add_argument("input", nargs="?", default="-", help="puzzle file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="solution file, - for stdout")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=256, help="puzzles sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write 'puzzle,solution' lines as they finish, not solutions in input order")
+    args = parser.parse_args(argv)
+
+    fin = sys.stdin if args.input == "-" else open(args.input)
+    fout = sys.stdout if args.output == "-" else open(args.output, "w")
+    num_puzzles = num_unsolved = num_invalid = 0
+    t1 = time.time()
+    try:
+        for puzzle, solution in solve_many(read_puzzles(fin), args.workers, args.chunksize, not args.unordered):
+            fout.write(f"{puzzle},{solution}\n" if args.unordered else f"{solution}\n")
+            num_puzzles += 1
+            num_unsolved += not solution
+            num_invalid += solution == INVALID
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+        if fout is not sys.stdout:
+            fout.close()
+    t2 = time.time()
+    print(f"Solved {num_puzzles - num_unsolved - num_invalid}/{num_puzzles} puzzles in {t2-t1:.2f} seconds "
+          f"({num_puzzles / max(t2-t1, 1e-9):.0f} puzzles/s), {num_invalid} invalid lines", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
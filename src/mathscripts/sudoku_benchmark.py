@@ -0,0 +1,233 @@
+"""Benchmark the sudoku solvers on bundled puzzle sets.
+
+For every backend and puzzle set this reports throughput, p50/p99 latency and,
+per puzzle, the nodes expanded, guesses and backtracks. Latency is measured with
+the plain solver classes; the counts come from a second run with counting
+subclasses, so the solvers themselves carry no instrumentation.
+
+Run:  sudoku-benchmark --backends backtracking dlx --sets easy hard -o bench.json
+"""
+import json
+import math
+import platform
+import signal
+import time
+
+from .benchmark import git_commit
+from .sudoku import DancingLinks, ExactCoverSudoku, Sudoku, parse_puzzle
+
+PUZZLE_SETS = {
+    # unique, solved by propagation alone
+    "easy": [
+        "16....8.995..61...3.8..7...72..1...4...4..6....6723.15.93.7.542..5...1..8..5...3.",
+        ".2..93.....6.2...79856....1.....462..4..8..95359...4...637.9.....4532.....1...359",
+        "5...9...7..4....8...27.1.....62.8374.3.6.985.25..7....7.....4181459...6.6....79..",
+        "1.4.3.89.3........92.4.76.5...1.4.53...8....4..13..287.8..51.2..156...4..3.2....9",
+        ".45.76.93........572..........71.946934..8.....74.9....9....234.7.164859...3....7",
+        "...87.2.9981.527.6........8.36....47.9.3..6..8.....1..5..96..21...5.13.46...34..5",
+        "...6..7.1.6..574..94.32.8..79.2........9.5..765..7...95...346724...6.9.8......14.",
+        "..4729.1...9...6..872..6.3...14......8.312746437........6.7.9..1.32..5...5.96....",
+        ".35..2.499.4..8.2..68....5.8..4....6...2.....7..68..925129....46..57.23.....2.96.",
+        "3.84..1...5...1397....6..5...9...4...1593.2..83.....1.723...5....6.2.7.9..18.762.",
+        ".7..1....6.427.....926.347....7.8.298..9.6.43...341.....1...894.3.1.7.6...9....1.",
+        "....8....9..416....4.7.3..85...3.92.721964....98.2..67...3.2..6....58.72.....983.",
+    ],
+    # unique, need guessing
+    "hard": [
+        "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+        "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..",
+        "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+        "85...24..72......9..4.........1.7..23.5...9...4...........8..7..17..........36.4.",
+        "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    ],
+    # unique with 17 givens, the fewest possible
+    "minimal17": [
+        "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+        "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+        "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+        "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+        "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+        "......52..8.4......3...9...5.1...6..2..7........3.....6...1..........7.4.......3.",
+        "6.2.5.........3.4..........43...8....1....2........7..5..27...........81...6.....",
+        ".524.........7.1..............8.2...3.....6...9.5.....1.6.3...........897........",
+        "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+    ],
+    # known to blow up depth-first search: many solutions, no solution, or an empty grid.
+    # the second one takes the backtracking backend many minutes
+    "pathological": [
+        ".....6....59.....82....8....45........3........6..3.54...325..6..................",
+        ".....5.8....6.1.43..........1.5........1.6...3.......553.....61........4.........",
+        ".................................................................................",
+    ],
+}
+DEFAULT_SETS = ("easy", "hard", "minimal17")
+
+class CountingSudoku(Sudoku):
+    """Sudoku that counts nodes, placements, cell choices and dead ends.
+    every node but the root is entered through a guess, since propagation leaves no forced cells"""
+    def __init__(self, puzzle) -> None:
+        super().__init__(puzzle)
+        self.nodes = self.placements = self.choices = self.backtracks = 0
+
+    def solve_recursive(self, solutions, rec_depth):
+        self.nodes += 1
+        super().solve_recursive(solutions, rec_depth)
+
+    def place_number(self, num, row, col):
+        self.placements += 1
+        super().place_number(num, row, col)
+
+    def choose_cell(self):
+        self.choices += 1
+        return super().choose_cell()
+
+    def propagate(self):
+        trail, consistent = super().propagate()
+        self.backtracks += not consistent
+        return trail, consistent
+
+    def counters(self):
+        return {"nodes": self.nodes, "guesses": self.nodes - 1, "backtracks": self.backtracks,
+                "placements": self.placements, "choices": self.choices}
+
+class CountingDancingLinks(DancingLinks):
+    """DancingLinks that counts search nodes, nodes entered through a column with several rows, and dead ends"""
+    def __init__(self, num_cols) -> None:
+        super().__init__(num_cols)
+        self.nodes = self.guesses = self.backtracks = 0
+        self.branching = []  # for every node on the search path, whether its column had more than one row
+
+    def search(self, partial=None):
+        self.nodes += 1
+        self.guesses += bool(self.branching) and self.branching[-1]
+        size, c = None, self.R[0]
+        while c != 0:
+            size = self.S[c] if size is None else min(size, self.S[c])
+            c = self.R[c]
+        self.backtracks += size == 0
+        self.branching.append(size is not None and size > 1)
+        try:
+            yield from super().search(partial)
+        finally:
+            self.branching.pop()
+
+class CountingExactCoverSudoku(ExactCoverSudoku):
+    links_class = CountingDancingLinks
+
+    def counters(self):
+        links = self.links
+        # every node chooses one column, and every node but the root selects one row
+        return {"nodes": links.nodes, "guesses": links.guesses, "backtracks": links.backtracks,
+                "placements": links.nodes - 1, "choices": links.nodes}
+
+def solve_backtracking(line, counting=False):
+    """return the solution as 81 digits ('' if there is none) and the counters, or None if not counting"""
+    sudoku = (CountingSudoku if counting else Sudoku)(parse_puzzle(line))
+    solutions = []
+    sudoku.solve_recursive(solutions, 81)
+    return (solutions[0] if solutions else ''), (sudoku.counters() if counting else None)
+
+def solve_dlx(line, counting=False):
+    sudoku = (CountingExactCoverSudoku if counting else ExactCoverSudoku)(parse_puzzle(line))
+    solution = sudoku.solve()
+    solution = ''.join(str(num) for row in solution for num in row) if solution else ''
+    return solution, (sudoku.counters() if counting else None)
+
+BACKENDS = {"backtracking": solve_backtracking, "dlx": solve_dlx}
+
+class Timeout(Exception):
+    pass
+
+def _raise_timeout(signum, frame):
+    raise Timeout
+
+def _timed(solve, line, timeout):
+    """run solve(line), giving up after timeout seconds (Unix only, None for no limit)"""
+    if timeout is None or not hasattr(signal, "setitimer"):
+        return solve(line)
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return solve(line)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def percentile(sorted_values, q):
+    """nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(q/100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def run_benchmark(backend, puzzles, timeout=None):
+    """time backend on every puzzle, then count its work in a second run. return a dict of results"""
+    solve = BACKENDS[backend]
+    per_puzzle = []
+    for line in puzzles:
+        t1 = time.perf_counter()
+        try:
+            solution, _ = _timed(solve, line, timeout)
+        except Timeout:
+            per_puzzle.append({"puzzle": line, "timed_out": True})
+            continue
+        t2 = time.perf_counter()
+        _, counters = solve(line, counting=True)
+        per_puzzle.append({"puzzle": line, "timed_out": False, "solved": bool(solution),
+                           "latency_ms": (t2-t1) * 1e3, **counters})
+
+    finished = [p for p in per_puzzle if not p["timed_out"]]
+    latencies = sorted(p["latency_ms"] for p in finished)
+    total_seconds = sum(latencies) / 1e3
+    mean = lambda key: sum(p[key] for p in finished) / len(finished) if finished else None
+    return {
+        "backend": backend,
+        "num_puzzles": len(puzzles),
+        "num_solved": sum(p.get("solved", False) for p in per_puzzle),
+        "num_timed_out": len(per_puzzle) - len(finished),
+        "total_seconds": total_seconds,
+        "puzzles_per_second": len(finished) / total_seconds if total_seconds else None,
+        "latency_ms": {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+                       "max": latencies[-1] if latencies else None},
+        "mean": {key: mean(key) for key in ("nodes", "guesses", "backtracks", "placements", "choices")},
+        "puzzles": per_puzzle,
+    }
+
+def package_version():
+    """installed version of mathscripts, None when it runs from a source tree that is not installed"""
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("mathscripts")
+    except PackageNotFoundError:
+        return None
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the sudoku solvers on bundled puzzle sets.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--sets", nargs="+", default=list(DEFAULT_SETS), choices=list(PUZZLE_SETS))
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per puzzle before giving up")
+    parser.add_argument("-o", "--output", default=None, help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for backend in args.backends:
+        for name in args.sets:
+            result = run_benchmark(backend, PUZZLE_SETS[name], args.timeout)
+            result["set"] = name
+            results.append(result)
+            mean, lat = result["mean"], result["latency_ms"]
+            print(f"{backend:>12} {name:>12}: {result['num_solved']}/{result['num_puzzles']} solved, "
+                  f"{result['num_timed_out']} timed out, {result['puzzles_per_second'] or 0:8.1f} puzzles/s, "
+                  f"p50 {lat['p50'] or 0:7.2f} ms, p99 {lat['p99'] or 0:7.2f} ms, "
+                  f"nodes {mean['nodes'] or 0:7.1f}, guesses {mean['guesses'] or 0:7.1f}, "
+                  f"backtracks {mean['backtracks'] or 0:7.1f}")
+
+    if args.output:
+        report = {"commit": git_commit(), "version": package_version(), "python": platform.python_version(), "machine": platform.machine(),
+                  "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "timeout": args.timeout, "results": results}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 import ot
 import ot.plot
 
+from mathscripts.optimal_transport import empirical_w, pairwise_cost, sample_trials, sinkhorn_log, sinkhorn_plan
+
 #%%
 n = 50  # nb samples
 
@@ -72,6 +74,52 @@ plt.title("OT matrix Sinkhorn with samples")
 
 plt.show()
 
+#%%
+# Log-domain Sinkhorn for many problems of the same shape at once. Working with the dual potentials
+# f, g instead of the scalings exp(f/reg), exp(g/reg) keeps small regularizations from underflowing,
+# eps_start anneals the regularization geometrically down to reg, and f, g can be warm-started.
+# With xs, xt instead of M the cost is computed block by block and never stored
+import time
+
+def in_iterations(log, i=0):
+    return (f"in {log['iterations'][i]} iterations" if log["converged"][i]
+            else f"NOT CONVERGED after {log['iterations'][i]} iterations (final error {log['err'][i]:.1e})")
+
+# the problem above: same cost as ot.sinkhorn, also from eps-scaling, and small reg where
+# the standard domain underflows and the cost approaches the exact one
+fs, gs, log_s = sinkhorn_log(a, b, lambd, M)
+print(f"log-domain Sinkhorn W1 cost: {log_s['cost'][0]:.3f} {in_iterations(log_s)} (ot.sinkhorn: {cost:.3f})")
+print(f"difference of the plans: {np.abs(sinkhorn_plan(fs, gs, M, lambd)[0] - Gs).max():.1e}")
+_, _, log_s = sinkhorn_log(a, b, lambd, M, eps_start=M.max())
+print(f"with eps-scaling from {M.max():.0f}: {log_s['cost'][0]:.3f} {in_iterations(log_s)}")
+_, _, log_s = sinkhorn_log(a, b, 1e-2, M, eps_start=M.max(), tol=1e-6)
+print(f"reg=0.01: {log_s['cost'][0]:.3f} {in_iterations(log_s)} (exact {log['cost']:.3f})")
+
+#%%
+# Many problems at once: 16 pairs of 500-point clouds, with stored and with online costs, and
+# warm-started from the potentials of nearby problems
+B, N = 16, 500
+rng = np.random.default_rng(0)
+xs_b = rng.normal(size=(B, N, 2))
+xt_b = rng.normal(size=(B, N, 2)) @ np.array([[1, -0.8], [-0.8, 1]]) + 4
+a_b = b_b = np.full((B, N), 1 / N)
+
+t1 = time.time()
+f_b, g_b, log_b = sinkhorn_log(a_b, b_b, 1.0, pairwise_cost(xs_b, xt_b), tol=1e-6)
+t2 = time.time()
+_, _, log_online = sinkhorn_log(a_b, b_b, 1.0, xs=xs_b, xt=xt_b, tol=1e-6, block=500)
+t3 = time.time()
+print(f"stored costs: {t2-t1:.1f} s, online: {t3-t2:.1f} s, max cost difference "
+      f"{np.abs(log_b['cost'] - log_online['cost']).max():.1e}, iterations {log_b['iterations'].mean():.0f}, "
+      f"{log_b['converged'].sum()}/{B} converged")
+
+xs_moved = xs_b + 0.05 * rng.normal(size=xs_b.shape)
+_, _, log_cold = sinkhorn_log(a_b, b_b, 1.0, xs=xs_moved, xt=xt_b, tol=1e-6)
+_, _, log_warm = sinkhorn_log(a_b, b_b, 1.0, xs=xs_moved, xt=xt_b, tol=1e-6, f=f_b, g=g_b)
+print(f"after moving the source points: {log_cold['iterations'].mean():.0f} iterations cold, "
+      f"{log_warm['iterations'].mean():.0f} warm-started, "
+      f"{log_cold['converged'].sum()} and {log_warm['converged'].sum()} of {B} converged")
+
 #%%
 "Illustrates the bound  E W₁(μₙ, μ) ≤ D/2·√(k/n)  on a finite metric space, where D = diam(X) and k = |X|."
 
@@ -113,36 +161,55 @@ plt.scatter(X[:, 0], X[:, 1], marker="+", color="b", label="support")
 plt.legend(); plt.title("Transport plan")
 plt.show()
 
+#%%
+# Batched Monte Carlo for the bound: all trials are drawn at once from one generator and solved
+# together, in closed form for k = 2, by sorting for supports on a line, and by EMD in a pool of
+# processes otherwise
+# the batched solvers reproduce the per-seed LPs of the loop this replaces
+for k, dim in [(2, 2), (5, 1), (5, 2)]:
+    trials = []
+    for seed in range(200):
+        rng = np.random.default_rng(seed)
+        X = rng.uniform(0, 1, size=(k, dim))
+        mu = rng.random(k)
+        mu /= mu.sum()
+        mu_n = np.bincount(rng.choice(k, size=n, p=mu), minlength=k) / n
+        trials.append((X, mu, mu_n, ot.emd(mu_n, mu, ot.dist(X, X), log=True)[1]["cost"]))
+    X, mu, mu_n, reference = map(np.array, zip(*trials))
+    print(f"k={k}, dim={dim}: max difference to ot.emd {np.abs(empirical_w(X, mu, mu_n)[0] - reference).max():.1e}")
+
 #%%
 # Vary the seeds and plot the histogram of W1 costs, the mean, and the bound
 
 num_trials = 1000
 k, n = 2, 100  # keep consistent with previous example
-costs = []
-
-for seed in range(num_trials):
-    rng = np.random.default_rng(seed)
-    X = rng.uniform(0, 1, size=(k, 2))
-    M = ot.dist(X, X)
-    D = M.max()
-    mu = rng.random(k)
-    mu /= mu.sum()
-    idx = rng.choice(k, size=n, p=mu)
-    counts = np.bincount(idx, minlength=k)
-    mu_n = counts / n
-    G, log = ot.emd(mu_n, mu, M, log=True)
-    cost = log["cost"]
-    costs.append(cost)
-
-costs = np.array(costs)
-bound = D * 0.5 * np.sqrt(k / n)  # last D from last trial
+X, mu, mu_n = sample_trials(np.random.default_rng(0), num_trials, k, n)
+costs, D = empirical_w(X, mu, mu_n)
+bounds = D * 0.5 * np.sqrt(k / n)
+bound = bounds.mean()
 
 plt.figure()
 plt.hist(costs, bins=30, alpha=0.7, label="W1(μₙ, μ) histogram")
 plt.axvline(costs.mean(), color='r', linestyle='--', label=f"Mean: {costs.mean():.4f}")
-plt.axvline(bound, color='g', linestyle='-', label=f"Bound: {bound:.4f}")
+plt.axvline(bound, color='g', linestyle='-', label=f"Mean bound: {bound:.4f}")
 plt.xlabel("W1(μₙ, μ)")
 plt.ylabel("Frequency")
 plt.title(f"Histogram of W1 costs over {num_trials} seeds (k={k}, n={n})")
 plt.legend()
 plt.show()
+
+#%%
+# Sweep k and n with 10^5 trials each: mean of W1(μₙ, μ) / (D/2·√(k/n)), which the bound keeps below 1.
+# k = 2 is solved in closed form and larger k on a line by sorting
+import time
+
+num_trials = 100_000
+rng = np.random.default_rng(1)
+print(f"{'k':>4} {'n':>6} {'mean ratio':>11} {'time':>7}")
+for k, dim in [(2, 2), (5, 1), (20, 1)]:
+    for n in (10, 100, 1000):
+        t1 = time.time()
+        X, mu, mu_n = sample_trials(rng, num_trials, k, n, dim)
+        costs, D = empirical_w(X, mu, mu_n)
+        ratio = np.mean(costs / (D * 0.5 * np.sqrt(k / n)))
+        print(f"{k:>4} {n:>6} {ratio:11.4f} {time.time() - t1:6.2f}s")